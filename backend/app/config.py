@@ -1,16 +1,33 @@
 import os
-from dotenv import load_dotenv
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from dotenv import load_dotenv, find_dotenv
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# 1. Try loading from the current directory (Root)
-load_dotenv()
+# Env Loading (One parse). In production (ENV=production) the orchestrator
+# injects the variables, so skip dotenv and its filesystem probing entirely.
+if os.getenv("ENV") != "production":
+    # Search upwards from the working directory (Root), fall back to backend/.env
+    env_file = find_dotenv(usecwd=True) or str(BASE_DIR / ".env")
+    load_dotenv(env_file, override=False)
 
-# 2. Try loading from the backend directory (Explicit fallback)
-env_path = BASE_DIR / ".env"
-if os.path.exists(env_path):
-    load_dotenv(dotenv_path=env_path)
+# Logging Setup (Once, for the whole app). LOG_LEVEL=WARNING silences info chatter in production.
+# Callers only enqueue the record; a background listener thread does the formatting
+# and the blocking stdout write, so logging never stalls the event loop.
+log_queue = queue.SimpleQueue()
+log_stream = logging.StreamHandler()
+log_stream.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+log_listener = QueueListener(log_queue, log_stream)
+log_enqueue = QueueHandler(log_queue)
+log_enqueue.setFormatter(logging.Formatter("%(message)s"))  # Listener applies the real format
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), handlers=[log_enqueue])
+log_listener.start()
+atexit.register(log_listener.stop)
+logger = logging.getLogger("Config")
 
-print(f"🔧 CONFIG LOADED. EODHD Key found: {'YES' if os.getenv('EODHD_API_KEY') else 'NO'}")
\ No newline at end of file
+logger.info("🔧 CONFIG LOADED. EODHD Key found: %s", "YES" if os.getenv("EODHD_API_KEY") else "NO")
\ No newline at end of file
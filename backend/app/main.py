@@ -1,19 +1,28 @@
 ﻿from . import config
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, Request, Response
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse
+from pathlib import Path
+import gzip
+import hashlib
+import logging
+import mimetypes
 import os
-from .routers import stocks, indices, charts, stream # <--- Add auth
 
 # Import Routers
 from .routers import stocks, indices, charts, stream 
+from .utils.responses import FastJSONResponse
+
+logger = logging.getLogger("Main")
 
 # Create App
 app = FastAPI(
     title="Stellar Stock Screener API",
     description="High-performance backend for stock analysis.",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # ==========================================
@@ -21,66 +30,241 @@ app = FastAPI(
 # ==========================================
 
 # CORS is vital for stability, even in production
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"], # Allow all for maximum compatibility
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Our policy is static (any origin, any method, any header), so instead of
+# CORSMiddleware's per-request origin matching we stamp precomputed headers.
+CORS_SIMPLE_HEADERS = [(b"access-control-allow-credentials", b"true")]
+CORS_PREFLIGHT_HEADERS = CORS_SIMPLE_HEADERS + [
+    (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+    (b"access-control-max-age", b"600"),
+    (b"content-type", b"text/plain; charset=utf-8"),
+    (b"content-length", b"2"),
+]
 
-# ==========================================
-# 2. API ROUTERS (Priority 1)
-# ==========================================
+class SimpleCORSMiddleware:
+    """Allow-all CORS (same behaviour as CORSMiddleware with '*' + credentials)."""
+    def __init__(self, app):
+        self.app = app
 
-app.include_router(stocks.router, prefix="/api/stocks", tags=["stocks"])
-app.include_router(indices.router, prefix="/api/indices", tags=["indices"])
-app.include_router(charts.router, prefix="/api/charts", tags=["charts"])
-app.include_router(stream.router, prefix="/ws", tags=["stream"])
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = Headers(scope=scope)
+        origin = headers.get("origin")
+        if not origin:
+            return await self.app(scope, receive, send)
+
+        # Credentialed requests can't use '*' -> echo the caller's origin
+        has_cookie = "cookie" in headers
+        allow_origin = [(b"access-control-allow-origin", origin.encode("latin-1") if has_cookie else b"*")]
+        if has_cookie: allow_origin.append((b"vary", b"Origin"))
 
+        # 1. Preflight: answer directly, never touch the router
+        if scope["method"] == "OPTIONS" and "access-control-request-method" in headers:
+            preflight = [(b"access-control-allow-origin", origin.encode("latin-1")), (b"vary", b"Origin")]
+            requested = headers.get("access-control-request-headers")
+            if requested: preflight.append((b"access-control-allow-headers", requested.encode("latin-1")))
+            await send({"type": "http.response.start", "status": 200, "headers": CORS_PREFLIGHT_HEADERS + preflight})
+            await send({"type": "http.response.body", "body": b"OK"})
+            return
+
+        # 2. Simple request: append headers to the outgoing response
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + CORS_SIMPLE_HEADERS + allow_origin
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+# Oversized uploads are refused from the Content-Length header, before the
+# multipart body is read off the socket (charts.py still caps the actual bytes).
+UPLOAD_PATH_PREFIX = "/api/charts/"
+UPLOAD_LIMIT_BYTES = charts.MAX_UPLOAD_BYTES + 64 * 1024  # + multipart framing
+
+class UploadLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"].startswith(UPLOAD_PATH_PREFIX):
+            try: declared = int(Headers(scope=scope).get("content-length") or 0)
+            except ValueError: declared = 0
+            if declared > UPLOAD_LIMIT_BYTES:
+                response = FastJSONResponse({"detail": "Image too large."}, status_code=413, headers={"Connection": "close"})
+                return await response(scope, receive, send)
+        await self.app(scope, receive, send)
+
+# Added first so CORS wraps it (the browser can still read the 413)
+app.add_middleware(UploadLimitMiddleware)
+app.add_middleware(SimpleCORSMiddleware)
 
 # ==========================================
-# 3. HEALTH CHECK (Critical for Railway)
+# 2. HEALTH CHECK (Critical for Railway)
 # ==========================================
 
+# Registered FIRST: the most frequent exact path is matched before
+# the router walks any of the API prefixes below.
 @app.get("/health")
 async def health_check():
     """Railway uses this to check if the app is alive."""
     return {"status": "healthy", "mode": "production"}
 
+# ==========================================
+# 3. API ROUTERS (Priority 1)
+# ==========================================
+
+app.include_router(stocks.router, prefix="/api/stocks", tags=["stocks"])
+app.include_router(indices.router, prefix="/api/indices", tags=["indices"])
+app.include_router(charts.router, prefix="/api/charts", tags=["charts"])
+app.include_router(stream.router, prefix="/ws", tags=["stream"])
+
+
 # ==========================================
 # 4. STATIC FILE SERVING (Smart Engine)
 # ==========================================
 
 # A. Define the path to the React Build folder
 # In Docker, this is usually at /app/frontend/build
-BUILD_DIR = "frontend/build"
+# Resolved to an absolute path ONCE (no per-request join / cwd lookups)
+BUILD_DIR = Path("frontend/build").resolve()
+INDEX_PATH = BUILD_DIR / "index.html"
+
+# Pre-load index.html ONCE (Zero Disk I/O on SPA navigation)
+# Every React route falls through to this file, so we keep the bytes in RAM
+# and hand out an ETag so browsers can revalidate with a cheap 304.
+INDEX_HTML_BYTES = INDEX_PATH.read_bytes() if INDEX_PATH.is_file() else None
+INDEX_ETAG = f'"{hashlib.md5(INDEX_HTML_BYTES).hexdigest()}"' if INDEX_HTML_BYTES else None
+if INDEX_HTML_BYTES is None:
+    # Fail loud at boot instead of discovering it per request
+    logger.warning("⚠️ FRONTEND BUILD MISSING: %s not found. Only API routes will be served.", INDEX_PATH)
+
+# Walk the build folder ONCE and remember every real file (e.g. "manifest.json")
+# together with its stat. The catch-all does an O(1) dict lookup instead of probing
+# the disk per request, and FileResponse re-uses the cached stat (no os.stat), so
+# servers advertising the ASGI pathsend/zero-copy extension can sendfile() directly.
+BUILD_FILES = {
+    p.relative_to(BUILD_DIR).as_posix(): p.stat() for p in BUILD_DIR.rglob("*") if p.is_file()
+} if BUILD_DIR.is_dir() else {}
 
 # B. Mount the 'static' folder (JS/CSS)
 # This handles requests like /static/js/main.js
-if os.path.exists(os.path.join(BUILD_DIR, "static")):
-    app.mount("/static", StaticFiles(directory=os.path.join(BUILD_DIR, "static")), name="static_assets")
+# React hashes these filenames, so they never change -> cache them forever
+# and ship a pre-compressed .gz copy (no per-response compression CPU).
+STATIC_DIR = BUILD_DIR / "static"
+GZIP_EXTENSIONS = (".js", ".css", ".svg")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+def precompress_static_assets(static_dir: Path):
+    """Writes file.gz next to every compressible asset. Returns the set of .gz paths."""
+    gz_files = set()
+    for p in static_dir.rglob("*"):
+        if not p.is_file() or not p.name.endswith(GZIP_EXTENSIONS): continue
+        gz_path = p.with_name(p.name + ".gz")
+        try:
+            if not gz_path.exists():
+                # Atomic write: multiple gunicorn workers may boot at once
+                tmp_path = gz_path.with_name(f"{gz_path.name}.{os.getpid()}.tmp")
+                tmp_path.write_bytes(gzip.compress(p.read_bytes(), 9))
+                os.replace(tmp_path, gz_path)
+            gz_files.add(os.path.realpath(gz_path))
+        except OSError: continue # Read-only image: fall back to raw bytes
+    return gz_files
+
+def build_static_index(static_dir: Path):
+    """Maps 'js/main.abc.js' -> (real path, stat) for every asset. Walked ONCE at boot."""
+    index = {}
+    for p in static_dir.rglob("*"):
+        if p.is_file():
+            real_path = os.path.realpath(p)
+            index[p.relative_to(static_dir).as_posix()] = (real_path, os.stat(real_path))
+    return index
 
-# C. The "Smart Catch-All" Route
+class ImmutableStaticFiles(StaticFiles):
+    def __init__(self, *args, index: dict = None, gz_files: set = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.index = index or {}
+        # Pre-compressed twins with their cached stat (no os.stat per response)
+        self.gz_stats = {real: st for real, st in self.index.values() if real in (gz_files or set())}
+
+    def lookup_path(self, path: str):
+        # Dict hit instead of realpath + stat on the filesystem
+        return self.index.get(path.replace(os.sep, "/"), ("", None))
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        gz_path = f"{full_path}.gz"
+        gz_stat = self.gz_stats.get(gz_path)
+        if gz_stat and "gzip" in request_headers.get("accept-encoding", ""):
+            response = FileResponse(
+                gz_path, status_code=status_code, stat_result=gz_stat,
+                media_type=mimetypes.guess_type(full_path)[0],
+                headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+        else:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE
+        return response
+
+if STATIC_DIR.is_dir():
+    static_gz_files = precompress_static_assets(STATIC_DIR)
+    app.mount(
+        "/static",
+        ImmutableStaticFiles(
+            directory=STATIC_DIR, check_dir=False,
+            index=build_static_index(STATIC_DIR), gz_files=static_gz_files
+        ),
+        name="static_assets"
+    )
+
+# C. Root-Level Assets (Explicit Routes)
+# Browsers hit these on every page load. We read them ONCE and register exact
+# routes so they never reach the catch-all or touch the disk again.
+ROOT_ASSETS = ["favicon.ico", "manifest.json", "robots.txt", "logo192.png", "logo512.png", "asset-manifest.json"]
+
+def make_asset_handler(content: bytes, media_type: str):
+    async def serve_asset():
+        return Response(content=content, media_type=media_type, headers={"Cache-Control": "public, max-age=86400"})
+    return serve_asset
+
+for asset_name in ROOT_ASSETS:
+    if asset_name in BUILD_FILES:
+        asset_mime = mimetypes.guess_type(asset_name)[0] or "application/octet-stream"
+        app.add_api_route(
+            f"/{asset_name}",
+            make_asset_handler((BUILD_DIR / asset_name).read_bytes(), asset_mime),
+            methods=["GET"],
+            include_in_schema=False
+        )
+
+# Backend namespaces that must NEVER fall back to the React App
+# (Keyed by first path segment: one partition + one set lookup)
+RESERVED_SEGMENTS = frozenset({"api", "ws", "static"})
+
+# D. The "Smart Catch-All" Route
 # This handles:
 # 1. Root files (manifest.json, favicon.ico, logo192.png) -> Serves the FILE
 # 2. App Routes (/stock/AAPL, /index/NSE) -> Serves index.html (React App)
 @app.get("/{full_path:path}")
-async def serve_react_app(full_path: str):
+async def serve_react_app(full_path: str, request: Request):
     
-    # 1. Safety: Don't trap API calls
-    if full_path.startswith("api/"):
-        return JSONResponse({"error": "API endpoint not found"}, status_code=404)
+    # 1. Safety: Don't trap API / WebSocket / asset calls
+    first_segment = full_path.partition("/")[0]
+    if first_segment in RESERVED_SEGMENTS:
+        return FastJSONResponse({"error": "API endpoint not found"}, status_code=404)
 
     # 2. Check if a specific file exists in the build folder (e.g. manifest.json)
-    # This fixes the PWA/Icon bug
-    file_path = os.path.join(BUILD_DIR, full_path)
-    if os.path.exists(file_path) and os.path.isfile(file_path):
-        return FileResponse(file_path)
-
-    # 3. Default: Serve index.html for React Router to handle
-    index_path = os.path.join(BUILD_DIR, "index.html")
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
+    # This fixes the PWA/Icon bug (Dict lookup, no disk hit for bogus paths)
+    file_stat = BUILD_FILES.get(full_path)
+    if file_stat is not None:
+        return FileResponse(BUILD_DIR / full_path, stat_result=file_stat)
+
+    # 3. Default: Serve index.html for React Router to handle (from memory)
+    if INDEX_HTML_BYTES is not None:
+        headers = {"ETag": INDEX_ETAG, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == INDEX_ETAG:
+            return Response(status_code=304, headers=headers)
+        return Response(content=INDEX_HTML_BYTES, media_type="text/html", headers=headers)
         
-    return JSONResponse({"error": "Frontend build not found. Please check Dockerfile."}, status_code=500)
+    return FastJSONResponse({"error": "Frontend build not found. Please check Dockerfile."}, status_code=500)
@@ -1,11 +1,70 @@
 ﻿from fastapi import APIRouter, UploadFile, File, HTTPException, Form
-from ..services import gemini_service, eodhd_service, technical_service, fmp_service, quant_engine, redis_service
-from ..services.system_watchdog import auto_heal
+from ..services import gemini_service, eodhd_service, technical_service, fmp_service, quant_engine, symbol_resolver
+from ..utils.responses import FastJSONResponse
 import asyncio
-import pandas as pd
+import hashlib
+import time
+from collections import OrderedDict
+from async_lru import alru_cache
+from starlette.formparsers import MultiPartParser
 
 router = APIRouter()
 
+# --- UPLOAD LIMITS ---
+# Chart screenshots are a few MB at most. Keep them memory-resident instead of
+# letting Starlette roll the SpooledTemporaryFile to disk above 1MB, and
+# refuse anything larger than the cap.
+MAX_UPLOAD_BYTES = 16 * 1024 * 1024
+MultiPartParser.spool_max_size = MAX_UPLOAD_BYTES
+
+# --- UPLOAD RESULT CACHE (Bounded LRU + TTL) ---
+# Same screenshot retried after a UI error -> dict lookup instead of Gemini + API calls.
+# Keyed by a 16-byte content hash of the image.
+ANALYSIS_CACHE: "OrderedDict[bytes, tuple]" = OrderedDict()
+ANALYSIS_CACHE_MAX = 256
+ANALYSIS_CACHE_TTL = 300
+
+def get_cached_analysis(digest: bytes):
+    hit = ANALYSIS_CACHE.get(digest)
+    if not hit: return None
+    expires_at, result = hit
+    if time.monotonic() > expires_at:
+        ANALYSIS_CACHE.pop(digest, None)
+        return None
+    ANALYSIS_CACHE.move_to_end(digest)
+    return result
+
+def set_cached_analysis(digest: bytes, result):
+    ANALYSIS_CACHE[digest] = (time.monotonic() + ANALYSIS_CACHE_TTL, result)
+    ANALYSIS_CACHE.move_to_end(digest)
+    while len(ANALYSIS_CACHE) > ANALYSIS_CACHE_MAX:
+        ANALYSIS_CACHE.popitem(last=False)
+
+# --- VISION CONTEXT CACHE (Ticker + Timeframe per image, LRU) ---
+# What a screenshot shows never changes, so the Gemini OCR answer outlives the
+# 5-min analysis TTL: a re-upload only refetches market data, no vision round-trip.
+CONTEXT_CACHE: "OrderedDict[bytes, str]" = OrderedDict()
+CONTEXT_CACHE_MAX = 1024
+
+def set_cached_context(digest: bytes, context_str: str):
+    CONTEXT_CACHE[digest] = context_str
+    CONTEXT_CACHE.move_to_end(digest)
+    while len(CONTEXT_CACHE) > CONTEXT_CACHE_MAX:
+        CONTEXT_CACHE.popitem(last=False)
+
+# --- UPLOAD SNIFFER (Trust bytes, not the client's MIME header) ---
+async def read_image_upload(chart_image: UploadFile, error_detail: str):
+    """Reads the first 16 bytes, rejects non-images early, then reads the whole file once (capped)."""
+    head = await chart_image.read(16)
+    if not gemini_service.sniff_image_mime(head):
+        raise HTTPException(status_code=400, detail=error_detail)
+    # Rewind + one capped read: a single copy out of the in-memory spool (no head + rest concat)
+    await chart_image.seek(0)
+    image_bytes = await chart_image.read(MAX_UPLOAD_BYTES + 1)
+    if len(image_bytes) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large.")
+    return image_bytes
+
 ERROR_TICKET = """TREND: Data Unavailable
 PATTERNS: Insufficient historical data to calculate structure.
 MOMENTUM: N/A
@@ -22,72 +81,67 @@ RISK_REWARD: N/A
 CONFIDENCE: Low (Missing Data)
 RATIONALE: The data provider does not supply enough candles for this asset."""
 
-@auto_heal(fallback_return=("NSEI.INDX", "EODHD"))
-async def resolve_symbol_smart(ai_text: str):
-    s = ai_text.strip().upper()
-    crypto_map = {"BITCOIN": "BTC", "ETHEREUM": "ETH", "SOLANA": "SOL", "RIPPLE": "XRP", "DOGECOIN": "DOGE"}
-    for name, short in crypto_map.items():
-        if name in s: s = s.replace(name, short)
-    clean_sym = s.replace("/", "").replace("-", "").replace(" ", "").replace("USDT", "").replace("USD", "")
-    
-    if clean_sym in["NIFTY", "NIFTY50", "NSEI"]: return "NSEI.INDX", "EODHD"
-    if clean_sym in["BANKNIFTY", "NIFTYBANK", "NSEBANK"]: return "NSEBANK.INDX", "EODHD"
-    if clean_sym in ["SENSEX", "BSESN"]: return "BSESN.INDX", "EODHD"
-    if clean_sym in["SPX", "S&P500", "GSPC"]: return "GSPC.INDX", "EODHD"
-    if clean_sym in["NDX", "NASDAQ"]: return "NDX.INDX", "EODHD"
-    if clean_sym in["DOW", "DJI", "DOWJONES"]: return "DJI.INDX", "EODHD"
-
-    commodities = {
-        "GOLD": "XAUUSD", "XAU": "XAUUSD", "XAUUSD": "XAUUSD", "GC=F": "XAUUSD",
-        "SILVER": "XAGUSD", "XAG": "XAGUSD", "XAGUSD": "XAGUSD", "SI=F": "XAGUSD",
-        "CRUDE": "CLUSD", "OIL": "CLUSD", "WTI": "CLUSD", "CLUSD": "CLUSD", "CL=F": "CLUSD",
-        "BRENT": "UKOIL", "UKOIL": "UKOIL",
-        "NATURALGAS": "NGUSD", "NGUSD": "NGUSD", "NG=F": "NGUSD"
-    }
-    if clean_sym in commodities: return commodities[clean_sym], "FMP"
-    if s in commodities: return commodities[s], "FMP"
-    
-    crypto_list =["BTC", "ETH", "SOL", "XRP", "DOGE", "BNB", "MATIC", "ADA", "AVAX", "DOT", "LTC", "SHIB"]
-    if clean_sym in crypto_list: return f"{clean_sym}-USD.CC", "EODHD"
-    for c in crypto_list:
-        if c in s: return f"{c}-USD.CC", "EODHD"
-
-    if "." not in s: return f"{s}.NSE", "EODHD"
-    if ".NS" in s: return s.replace(".NS", ".NSE"), "EODHD"
-    if ".BO" in s: return s.replace(".BO", ".BSE"), "EODHD"
-    return s, "EODHD"
+# --- SHARED RESOLUTION + HISTORY CACHE (Per Worker) ---
+# Symbol resolution lives in services/symbol_resolver (memoized there).
+# Candle history is keyed on a time bucket sized per range (intraday bars go stale
+# fast, EOD bars barely move), so re-uploads inside one bucket skip the HTTP call.
+HISTORY_TTL_SECONDS = {"5M": 60, "1D": 600, "1W": 600, "1M": 600}
+HISTORY_CACHE_TTL = max(HISTORY_TTL_SECONDS.values())
+# Live quotes are memoized per symbol for a few seconds: repeat uploads of the same
+# ticker (other timeframes, retries, other users) reuse the snapshot instead of a new RTT.
+QUOTE_CACHE_TTL = 5
+
+@alru_cache(maxsize=4096, ttl=HISTORY_CACHE_TTL)
+async def fetch_history_cached(data_source: str, symbol: str, lookup_range: str, bar_bucket: int):
+    # bar_bucket is only part of the cache key -> a new bucket means a fresh fetch
+    if data_source == "FMP": return await fmp_service.get_market_history_async(symbol, lookup_range)
+    return await eodhd_service.get_historical_data_async(symbol, lookup_range)
+
+@alru_cache(maxsize=2048, ttl=QUOTE_CACHE_TTL)
+async def fetch_quote_cached(data_source: str, symbol: str):
+    # Read-only for callers (price is stitched into a copied candle)
+    if data_source == "FMP": return await fmp_service.get_quote_async(symbol)
+    return await eodhd_service.get_live_price_async(symbol)
 
 @router.post("/analyze")
 async def analyze_chart_image(chart_image: UploadFile = File(...), analysis_type: str = Form("stock")):
-    if not chart_image.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="Invalid file.")
-
-    image_bytes = await chart_image.read()
+    image_bytes = await read_image_upload(chart_image, "Invalid file.")
+    digest = hashlib.blake2b(image_bytes, digest_size=16, person=b"analyze").digest()
+    cached = get_cached_analysis(digest)
+    if cached: return FastJSONResponse(cached)
     
     # 1. AI OCR: Read Ticker and Timeframe ONLY (Zero Hallucination)
-    context_str = await asyncio.to_thread(gemini_service.identify_chart_context_from_image, image_bytes)
-    parts = context_str.split(',')
-    raw_symbol = parts[0] if len(parts) > 0 else "NOT_FOUND"
-    timeframe = parts[1] if len(parts) > 1 else "1D"
+    context_str = CONTEXT_CACHE.get(digest)
+    if context_str:
+        CONTEXT_CACHE.move_to_end(digest)
+    else:
+        vision_bytes = await asyncio.to_thread(gemini_service.prepare_vision_image, image_bytes)
+        if vision_bytes is None: raise HTTPException(status_code=400, detail="Invalid file.")
+        context_str = await gemini_service.identify_chart_context_from_image_async(vision_bytes)
+        if "NOT_FOUND" not in context_str: set_cached_context(digest, context_str)
+    raw_symbol, _, rest = context_str.partition(',')
+    timeframe = rest.partition(',')[0] or "1D"
     
     if timeframe not in["5M", "15M", "30M", "1H", "4H", "1D", "1W", "1M"]: timeframe = "1D"
 
     if not raw_symbol or "NOT_FOUND" in raw_symbol:
-        return {"identified_symbol": "NOT_FOUND", "analysis_data": "Could not identify symbol text.", "technical_data": {}}
+        return FastJSONResponse({"identified_symbol": "NOT_FOUND", "analysis_data": "Could not identify symbol text.", "technical_data": {}})
 
-    final_symbol, data_source = await resolve_symbol_smart(raw_symbol)
+    final_symbol, data_source = await symbol_resolver.resolve(raw_symbol)
 
     # 2. Fetch REAL Math Data for the exact Timeframe
     is_intraday = timeframe in["5M", "15M", "30M", "1H", "4H"]
     lookup_range = "5M" if is_intraday else timeframe
 
-    if data_source == "FMP":
-        chart_list = await asyncio.to_thread(fmp_service.get_commodity_history, final_symbol, lookup_range)
-        if not chart_list: chart_list = await asyncio.to_thread(fmp_service.get_crypto_history, final_symbol, lookup_range)
-        quote = await asyncio.to_thread(fmp_service.get_quote, final_symbol)
-    else:
-        chart_list = await asyncio.to_thread(eodhd_service.get_historical_data, final_symbol, lookup_range)
-        quote = await asyncio.to_thread(eodhd_service.get_live_price, final_symbol)
+    # History (cached per bar) + Live Quote (5s memo) -> fetch concurrently
+    bar_bucket = int(time.time()) // HISTORY_TTL_SECONDS.get(lookup_range, 60)
+    cached_history, quote = await asyncio.gather(
+        fetch_history_cached(data_source, final_symbol, lookup_range, bar_bucket),
+        fetch_quote_cached(data_source, final_symbol)
+    )
+    # Copy before stitching so the cached series is never mutated
+    chart_list = list(cached_history) if cached_history else []
+    if chart_list: chart_list[-1] = dict(chart_list[-1])
 
     # 3. Stitch Live Price for 100% Accuracy
     current_price = quote.get('price') if quote else None
@@ -96,17 +150,15 @@ async def analyze_chart_image(chart_image: UploadFile = File(...), analysis_type
         if current_price > chart_list[-1]['high']: chart_list[-1]['high'] = current_price
         if current_price < chart_list[-1]['low']: chart_list[-1]['low'] = current_price
 
-    # 4. Mathematical Resampling & Processing
-    if is_intraday and timeframe != "5M":
-        chart_list = technical_service.resample_chart_data(chart_list, timeframe)
+    # 4. Mathematical Resampling & Processing (one hop to the TA pool, loop stays free)
+    df = None
+    if chart_list:
+        resample_to = timeframe if is_intraday and timeframe != "5M" else None
+        df, technicals, pivots, mas = await technical_service.run_ta(technical_service.indicator_bundle, chart_list, resample_to)
 
-    if not chart_list or len(chart_list) < 20:
+    if df is None or len(df) < 20:
         analysis_report = ERROR_TICKET
     else:
-        df = pd.DataFrame(chart_list)
-        technicals = technical_service.calculate_technical_indicators(df)
-        pivots = technical_service.calculate_pivot_points(df)
-        mas = technical_service.calculate_moving_averages(df)
         # Execute Pure Quant Engine (No AI)
         analysis_report = quant_engine.generate_algorithmic_report(final_symbol, timeframe, technicals, pivots, mas)
 
@@ -114,16 +166,26 @@ async def analyze_chart_image(chart_image: UploadFile = File(...), analysis_type
     if frontend_sym.endswith(".NSE"): frontend_sym = frontend_sym.replace(".NSE", ".NS")
     elif frontend_sym.endswith(".BSE"): frontend_sym = frontend_sym.replace(".BSE", ".BO")
     
-    return {
+    result = {
         "identified_symbol": frontend_sym,
         "analysis_data": analysis_report,
         "technical_data": {} 
     }
+    set_cached_analysis(digest, result)
+    return FastJSONResponse(result)
 
 @router.post("/analyze-pure")
 async def analyze_pure_chart(chart_image: UploadFile = File(...)):
-    if not chart_image.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="Invalid file type.")
-    image_bytes = await chart_image.read()
-    analysis_report = await asyncio.to_thread(gemini_service.analyze_pure_vision, image_bytes)
-    return {"analysis": analysis_report}
\ No newline at end of file
+    image_bytes = await read_image_upload(chart_image, "Invalid file type.")
+    digest = hashlib.blake2b(image_bytes, digest_size=16, person=b"pure").digest()
+    cached = get_cached_analysis(digest)
+    if cached: return FastJSONResponse(cached)
+    vision_bytes = await asyncio.to_thread(gemini_service.prepare_vision_image, image_bytes)
+    if vision_bytes is None: raise HTTPException(status_code=400, detail="Invalid file type.")
+    context_str, analysis_report = await gemini_service.identify_and_analyze_async(vision_bytes)
+    # Same call read the ticker + timeframe -> seed /analyze so this screenshot never pays a second vision RTT
+    if "NOT_FOUND" not in context_str:
+        set_cached_context(hashlib.blake2b(image_bytes, digest_size=16, person=b"analyze").digest(), context_str)
+    result = {"analysis": analysis_report}
+    if not analysis_report.startswith("**VERDICT:** ERROR"): set_cached_analysis(digest, result)
+    return FastJSONResponse(result)
\ No newline at end of file
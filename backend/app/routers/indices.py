@@ -1,10 +1,15 @@
 ﻿import asyncio
-import pandas as pd
-from fastapi import APIRouter, HTTPException
+import logging
+import time
+from dataclasses import dataclass
+from async_lru import alru_cache
+from fastapi import APIRouter, HTTPException, Request
 # Import robust services
 from ..services import eodhd_service, redis_service, technical_service
+from ..utils.responses import dumps, etag_for, etag_json_response
 
 router = APIRouter()
+logger = logging.getLogger("Indices")
 
 # ==========================================
 # 1. GLOBAL INDICES CONFIGURATION
@@ -34,73 +39,104 @@ INDICES_CONFIG = [
     {"name": "Bitcoin",     "symbol": "BTC-USD.CC",   "currency": "USD"},
 ]
 
+# symbol -> (name, currency), built once: O(1) lookup for the details page
+INDEX_META = {item["symbol"]: (item["name"], item["currency"]) for item in INDICES_CONFIG}
+# Banner request inputs are static -> built once, not on every cache miss
+SUMMARY_SYMBOLS = [item["symbol"] for item in INDICES_CONFIG]
+SUMMARY_CODES = [(item, item["symbol"].split('.')[0]) for item in INDICES_CONFIG]
+
+# One banner row. Slotted + frozen: no per-row __dict__, and orjson writes
+# dataclasses natively (same JSON object shape the frontend reads).
+@dataclass(frozen=True, slots=True)
+class IndexRow:
+    name: str
+    symbol: str
+    price: float
+    change: float
+    percent_change: float
+    currency: str
+
+# Placeholder row per index (missing data), built once and reused
+EMPTY_ROWS = {item["symbol"]: IndexRow(item["name"], item["symbol"], 0.0, 0.0, 0.0, item["currency"]) for item in INDICES_CONFIG}
+
+# --- SAFE FLOAT CONVERTER ---
+def safe_float(val):
+    # Sentinels are screened up front: the try body is just the float() call
+    if val is None or val == 'NA' or val == 'None': return 0.0
+    try: return float(val)
+    except (TypeError, ValueError): return 0.0
+
 # ==========================================
 # 2. HOMEPAGE TICKER (BULK + CACHED)
 # ==========================================
 
+# In-process layer in front of Redis: banner polls inside the window cost a
+# memory read (no Redis round-trip / decode). Worst-case staleness = 5s + 10s Redis TTL.
+SUMMARY_LOCAL_TTL = 5
+# The window keeps the serialized body + its ETag, so a hit is a header compare.
+SUMMARY_CACHE = {"expires": 0.0, "body": b"", "etag": ""}
+SUMMARY_LOCK = asyncio.Lock()
+
 @router.get("/summary")
-async def get_indices_summary():
+async def get_indices_summary(request: Request):
+    if SUMMARY_CACHE["expires"] > time.monotonic():
+        return etag_json_response(request, SUMMARY_CACHE["body"], SUMMARY_CACHE["etag"])
+
+    # Single-flight: concurrent pollers on an expired window share one rebuild
+    async with SUMMARY_LOCK:
+        if SUMMARY_CACHE["expires"] > time.monotonic():
+            return etag_json_response(request, SUMMARY_CACHE["body"], SUMMARY_CACHE["etag"])
+        body, has_data = await build_indices_summary()
+        if has_data:
+            SUMMARY_CACHE.update(body=body, etag=etag_for(body), expires=time.monotonic() + SUMMARY_LOCAL_TTL)
+            return etag_json_response(request, body, SUMMARY_CACHE["etag"])
+        return etag_json_response(request, body)
+
+async def build_indices_summary():
     """
     Fetches ALL indices in ONE single API call.
     Includes robust 'NA' handling to prevent 500 Errors.
+    Returns (serialized body, has_data): Redis holds the JSON text, so a hit is served as-is.
     """
     cache_key = "indices_banner_v6_fix"
     
     # 1. Check Cache (Async)
-    cached = await redis_service.redis_client.get_cache(cache_key)
-    if cached: return cached
+    cached = await redis_service.redis_client.get_cache_raw(cache_key)
+    if cached: return cached, True
 
-    # 2. Fetch Bulk Data
-    symbols_list = [item["symbol"] for item in INDICES_CONFIG]
-    raw_data = await asyncio.to_thread(eodhd_service.get_real_time_bulk, symbols_list)
+    # 2. Fetch Bulk Data (every banner symbol in ONE request)
+    raw_data = await eodhd_service.get_real_time_bulk_async(SUMMARY_SYMBOLS)
     
-    # 3. Map Results
-    data_map = {}
-    if raw_data and isinstance(raw_data, list):
-        data_map = {item['code']: item for item in raw_data}
-    elif raw_data and isinstance(raw_data, dict):
-        data_map = {raw_data['code']: raw_data}
+    # 3. Map Results (the bulk helper always returns a list)
+    data_map = {item['code']: item for item in raw_data if isinstance(item, dict) and 'code' in item}
 
     final_results = []
-    
-    # --- SAFE FLOAT CONVERTER ---
-    def safe_float(val):
-        try:
-            if val is None or val == 'NA' or val == 'None': return 0.0
-            return float(val)
-        except: return 0.0
-
-    for config in INDICES_CONFIG:
+    for config, code_only in SUMMARY_CODES:
         ticker = config["symbol"]
-        code_only = ticker.split('.')[0] 
         
         # Try finding by full ticker or just code
         market_data = data_map.get(ticker) or data_map.get(code_only)
         
         if market_data:
-            final_results.append({
-                "name": config["name"],
-                "symbol": config["symbol"],
-                "price": safe_float(market_data.get('close') or market_data.get('previousClose')),
-                "change": safe_float(market_data.get('change')),
-                "percent_change": safe_float(market_data.get('change_p')),
-                "currency": config["currency"]
-            })
+            final_results.append(IndexRow(
+                config["name"],
+                ticker,
+                safe_float(market_data.get('close') or market_data.get('previousClose')),
+                safe_float(market_data.get('change')),
+                safe_float(market_data.get('change_p')),
+                config["currency"]
+            ))
         else:
             # Fallback for missing data so UI doesn't break
-            final_results.append({
-                "name": config["name"],
-                "symbol": config["symbol"],
-                "price": 0.0, "change": 0.0, "percent_change": 0.0,
-                "currency": config["currency"]
-            })
+            final_results.append(EMPTY_ROWS[ticker])
 
     # 4. Cache Result (Short TTL for live feel)
-    has_data = any(x['price'] > 0 for x in final_results)
+    body = dumps(final_results)
+    has_data = any(row.price > 0 for row in final_results)
     if has_data:
-        await redis_service.redis_client.set_cache(cache_key, final_results, 10)
+        await redis_service.redis_client.set_cache_raw(cache_key, body, redis_service.jittered_ttl(10))
     
-    return final_results
+    return body, has_data
 
 @router.get("/market-mood")
 async def get_market_mood():
@@ -115,8 +151,8 @@ async def get_market_mood():
     try:
         # Fetch Nifty 50 Daily History & Live India VIX
         tasks = {
-            "nifty": asyncio.to_thread(eodhd_service.get_historical_data, "NSEI.INDX", "1D"),
-            "vix": asyncio.to_thread(eodhd_service.get_live_price, "INDIAVIX.INDX")
+            "nifty": eodhd_service.get_historical_data_async("NSEI.INDX", "1D"),
+            "vix": eodhd_service.get_live_price_async("INDIAVIX.INDX")
         }
         results = await asyncio.gather(*tasks.values(), return_exceptions=True)
         raw = dict(zip(tasks.keys(), results))
@@ -134,9 +170,7 @@ async def get_market_mood():
             vix_score = max(0, min(100, 100 - ((vix - 10) / 15) * 100))
 
             # 2. Momentum Proxy (Nifty RSI)
-            df = pd.DataFrame(nifty_data)
-            techs = technical_service.calculate_technical_indicators(df)
-            mas = technical_service.calculate_moving_averages(df)
+            _, techs, _, mas = await technical_service.run_ta(technical_service.indicator_bundle, nifty_data)
             
             rsi = float(techs.get('rsi', 50))
             
@@ -169,7 +203,7 @@ async def get_market_mood():
             color = "#EF4444" # Red
 
         res = {"mmi": round(mmi, 2), "status": status, "description": desc, "color": color}
-        await redis_service.redis_client.set_cache(cache_key, res, 300) # 5 Min Cache
+        await redis_service.redis_client.set_cache_jittered(cache_key, res, 300) # 5 Min Cache
         return res
     except Exception as e:
         return {"mmi": 50.0, "status": "Neutral", "description": "Analyzing market data...", "color": "#EDBB5A"}
@@ -178,10 +212,25 @@ async def get_market_mood():
 # 3. HEADER PRICE (Index Details)
 # ==========================================
 
+# Header polls for the same index within a few seconds share one quote
+# (native async over the shared keep-alive pool, no thread hop).
+# The quote is also a Redis piece, so workers share it and /details reuses it.
+INDEX_QUOTE_TTL = 5
+INDEX_QUOTE_SHARED_TTL = 10
+
+@alru_cache(maxsize=256, ttl=INDEX_QUOTE_TTL)
+async def fetch_index_quote(symbol: str):
+    quote_key = f"index_quote_v1_{symbol}"
+    cached = await redis_service.redis_client.get_cache(quote_key)
+    if cached: return cached
+    data = await eodhd_service.get_live_price_async(symbol)
+    if data: await redis_service.redis_client.set_cache_jittered(quote_key, data, INDEX_QUOTE_SHARED_TTL)
+    return data
+
 @router.get("/{index_symbol:path}/live-price")
 async def get_index_live_price(index_symbol: str):
     symbol = eodhd_service.format_symbol_for_eodhd(index_symbol)
-    data = await asyncio.to_thread(eodhd_service.get_live_price, symbol)
+    data = await fetch_index_quote(symbol)
     if not data: raise HTTPException(status_code=404, detail="Unavailable")
     return data
 
@@ -189,40 +238,47 @@ async def get_index_live_price(index_symbol: str):
 # 4. INDEX DETAILS PAGE (CHART + TECHS)
 # ==========================================
 
-@router.get("/{index_symbol:path}/details")
-async def get_index_details(index_symbol: str):
-    symbol = eodhd_service.format_symbol_for_eodhd(index_symbol)
-    cache_key = f"index_details_v4_{symbol}"
-    
-    cached = await redis_service.redis_client.get_cache(cache_key)
-    if cached: return cached
+# Cached as independent pieces fetched with ONE MGET: technicals move slowly (daily
+# bars), the quote is live. A miss recomputes only the stale piece.
+INDEX_TECH_TTL = 300
 
-    # Parallel Fetch
-    tasks = {
-        "chart": asyncio.to_thread(eodhd_service.get_historical_data, symbol, "1D"),
-        "quote": asyncio.to_thread(eodhd_service.get_live_price, symbol)
-    }
-    
-    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
-    raw = dict(zip(tasks.keys(), results))
-    
-    chart_data = raw.get('chart', [])
-    quote = raw.get('quote', {})
+async def build_index_technicals(symbol: str, tech_key: str):
+    chart_data = await eodhd_service.get_historical_data_async(symbol, "1D")
 
     # Calculate Technicals
     technicals, mas, pivots = {}, {}, {}
     if chart_data and len(chart_data) > 30:
         try:
-            df = pd.DataFrame(chart_data)
-            technicals = technical_service.calculate_technical_indicators(df)
-            mas = technical_service.calculate_moving_averages(df)
-            pivots = technical_service.calculate_pivot_points(df)
-        except: pass
+            _, technicals, pivots, mas = await technical_service.run_ta(technical_service.indicator_bundle, chart_data)
+        except (KeyError, IndexError, ValueError, TypeError) as e:
+            logger.warning("Index technicals failed for %s", symbol, exc_info=e)
+
+    tech = {"technical_indicators": technicals, "moving_averages": mas, "pivot_points": pivots}
+    # Empty result (upstream hiccup) is retried sooner
+    await redis_service.redis_client.set_cache_jittered(tech_key, tech, INDEX_TECH_TTL if technicals else 60)
+    return tech
+
+@router.get("/{index_symbol:path}/details")
+async def get_index_details(index_symbol: str, request: Request):
+    symbol = eodhd_service.format_symbol_for_eodhd(index_symbol)
+    tech_key = f"index_tech_v1_{symbol}"
+    
+    tech, quote = await redis_service.redis_client.get_many([tech_key, f"index_quote_v1_{symbol}"])
+
+    # Parallel Fetch (missing pieces only)
+    tasks = {}
+    if tech is None: tasks["tech"] = redis_service.singleflight(tech_key, lambda: build_index_technicals(symbol, tech_key))
+    if quote is None: tasks["quote"] = fetch_index_quote(symbol)
+    if tasks:
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raw = dict(zip(tasks.keys(), results))
+        if "tech" in raw: tech = raw["tech"]
+        if "quote" in raw: quote = raw["quote"]
+    if not isinstance(tech, dict): tech = {}
+    if not isinstance(quote, dict): quote = {}
 
     # Profile Construction
-    config_match = next((i for i in INDICES_CONFIG if i["symbol"] == symbol), None)
-    name = config_match["name"] if config_match else index_symbol
-    curr = config_match["currency"] if config_match else "USD"
+    name, curr = INDEX_META.get(symbol, (index_symbol, "USD"))
 
     profile = {
         "companyName": name, 
@@ -239,12 +295,10 @@ async def get_index_details(index_symbol: str):
     final_data = {
         "profile": profile, 
         "quote": quote,
-        "technical_indicators": technicals, 
-        "moving_averages": mas, 
-        "pivot_points": pivots,
+        "technical_indicators": tech.get("technical_indicators", {}), 
+        "moving_averages": tech.get("moving_averages", {}), 
+        "pivot_points": tech.get("pivot_points", {}),
         "analyst_ratings": [], 
         "keyStats": {}
     }
-    
-    await redis_service.redis_client.set_cache(cache_key, final_data, 60)
-    return final_data
+    return etag_json_response(request, dumps(final_data))
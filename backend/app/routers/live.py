@@ -1,67 +1,87 @@
 import asyncio
-import json
+import orjson
 import logging
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from ..services import eodhd_service
 
 router = APIRouter()
+logger = logging.getLogger("Live")
 
 # Manager to handle active connections
+# One poll task per SYMBOL (not per socket): N viewers of NIFTY share one upstream
+# quote per tick. The task is started by the first subscriber and cancelled by the last.
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
+        self.subscribers: dict[str, set[WebSocket]] = {}
+        self.pollers: dict[str, asyncio.Task] = {}
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, symbol: str):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.subscribers.setdefault(symbol, set()).add(websocket)
+        if symbol not in self.pollers:
+            self.pollers[symbol] = asyncio.create_task(self._poll_symbol(symbol))
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+    def disconnect(self, websocket: WebSocket, symbol: str):
+        subs = self.subscribers.get(symbol)
+        if subs is None: return
+        subs.discard(websocket)
+        if not subs:
+            del self.subscribers[symbol]
+            task = self.pollers.pop(symbol, None)
+            if task: task.cancel()
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+    async def _poll_symbol(self, symbol: str):
+        # Identify Asset Class
+        is_crypto = "BTC" in symbol or "ETH" in symbol or ".CC" in symbol
+
+        # Normalization for EODHD logic
+        eod_symbol = eodhd_service.format_symbol_for_eodhd(symbol)
+
+        # THROTTLE (The Heartbeat)
+        # For Crypto: Ultra Fast (1s)
+        # For NSE/Stocks: Standard Fast (2s) - To respect API limits while feeling "Live"
+        sleep_time = 1 if is_crypto else 2
+
+        while symbol in self.subscribers:
+            try:
+                # 1. FETCH DATA (once per tick for every viewer)
+                data = await eodhd_service.get_live_price_async(eod_symbol)
+
+                if data and data.get('price'):
+                    # 2. CONSTRUCT PAYLOAD
+                    payload = {
+                        "price": data.get('price'),
+                        "change": data.get('change'),
+                        "percent_change": data.get('changesPercentage'),
+                        "volume": data.get('volume'),
+                        "timestamp": data.get('timestamp')
+                    }
+
+                    # 3. PUSH TO FRONTEND (serialized once per tick, sent to all subscribers concurrently)
+                    msg = orjson.dumps(payload).decode()
+                    subs = list(self.subscribers.get(symbol, ()))
+                    results = await asyncio.gather(*[ws.send_text(msg) for ws in subs], return_exceptions=True)
+                    for ws, res in zip(subs, results):
+                        if isinstance(res, Exception): self.disconnect(ws, symbol)
+            except Exception as e:
+                logger.warning("WS Poll Error %s: %s", symbol, e)
+
+            await asyncio.sleep(sleep_time)
 
 manager = ConnectionManager()
 
 @router.websocket("/ws/{symbol}")
 async def websocket_endpoint(websocket: WebSocket, symbol: str):
-    await manager.connect(websocket)
-    
-    # Identify Asset Class
     symbol = symbol.upper()
-    is_crypto = "BTC" in symbol or "ETH" in symbol or ".CC" in symbol
-    is_us = ".US" in symbol and not is_crypto
-    is_nse = ".NSE" in symbol or ".BO" in symbol or "NIFTY" in symbol or "SENSEX" in symbol
-
-    # Normalization for EODHD logic
-    eod_symbol = eodhd_service.format_symbol_for_eodhd(symbol)
+    await manager.connect(websocket, symbol)
 
     try:
+        # The shared poller pushes prices; this loop only detects pings / close
         while True:
-            # 1. FETCH DATA (Fastest Method Available)
-            data = await asyncio.to_thread(eodhd_service.get_live_price, eod_symbol)
-            
-            if data and data.get('price'):
-                # 2. CONSTRUCT PAYLOAD
-                payload = {
-                    "price": data.get('price'),
-                    "change": data.get('change'),
-                    "percent_change": data.get('changesPercentage'),
-                    "volume": data.get('volume'),
-                    "timestamp": data.get('timestamp')
-                }
-                
-                # 3. PUSH TO FRONTEND
-                await manager.send_personal_message(json.dumps(payload), websocket)
-            
-            # 4. THROTTLE (The Heartbeat)
-            # For Crypto: Ultra Fast (1s)
-            # For NSE/Stocks: Standard Fast (2s) - To respect API limits while feeling "Live"
-            sleep_time = 1 if is_crypto else 2
-            await asyncio.sleep(sleep_time)
+            await websocket.receive_text()
 
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        manager.disconnect(websocket, symbol)
     except Exception as e:
-        print(f"WS Error {symbol}: {e}")
-        manager.disconnect(websocket)
\ No newline at end of file
+        logger.warning("WS Error %s: %s", symbol, e)
+        manager.disconnect(websocket, symbol)
@@ -1,9 +1,11 @@
 ﻿from ..services import quant_engine
 import asyncio
 import math
-import pandas as pd
-import json
+import time
+from datetime import date
+import logging
 from urllib.parse import unquote
+from collections import OrderedDict
 from fastapi import APIRouter, HTTPException, Query, Body
 # ROBUST SERVICE IMPORTS
 from ..services import (
@@ -16,10 +18,12 @@ from ..services import (
     sentiment_service, 
     redis_service
 )
+from ..utils.responses import dumps, raw_json_response
 from pydantic import BaseModel
 from typing import List, Dict, Any
 
 router = APIRouter()
+logger = logging.getLogger("Stocks")
 
 # ==========================================
 # 1. STRICT DATA MODELS
@@ -82,43 +86,8 @@ TRADINGVIEW_OVERRIDE_MAP = {
 # 2. INTELLIGENT ASSET RECOGNITION
 # ==========================================
 
-def identify_asset_class(symbol: str):
-    from urllib.parse import unquote
-    s = unquote(symbol).upper().strip()
-    clean_sym = s.replace("/", "").replace("-", "").replace(" ", "").replace("USDT", "").replace("USD", "").replace(".NS", "").replace(".BO", "").replace(".NSE", "").replace(".BSE", "")
-    
-    crypto_map = {"BITCOIN": "BTC", "ETHEREUM": "ETH", "SOLANA": "SOL", "RIPPLE": "XRP", "DOGECOIN": "DOGE"}
-    for name, short in crypto_map.items():
-        if name in s: s = s.replace(name, short)
-        
-    commodities_map = {
-        "GOLD": "XAUUSD", "XAU": "XAUUSD", "XAUUSD": "XAUUSD", "GC=F": "XAUUSD",
-        "SILVER": "XAGUSD", "XAG": "XAGUSD", "XAGUSD": "XAGUSD", "SI=F": "XAGUSD",
-        "CRUDE": "CLUSD", "OIL": "CLUSD", "WTI": "CLUSD", "CLUSD": "CLUSD", "CL=F": "CLUSD",
-        "BRENT": "UKOIL", "UKOIL": "UKOIL",
-        "NATURALGAS": "NGUSD", "NGUSD": "NGUSD", "NG=F": "NGUSD"
-    }
-    if s in commodities_map or clean_sym in commodities_map: 
-        return "FMP", commodities_map.get(s, commodities_map.get(clean_sym))
-    
-    crypto_shorts =["BTC", "ETH", "SOL", "XRP", "DOGE", "ADA", "MATIC", "BNB", "AVAX", "DOT", "LTC", "SHIB"]
-    base = s.replace("-USD.CC", "").replace("-USD", "").replace("USD", "").replace(".CC", "")
-    if base in crypto_shorts: return "EODHD", f"{base}-USD.CC"
-        
-    # STRICT EXACT MATCHING (Fixes HDFCBANK -> BANKNIFTY data hijack)
-    if clean_sym in["NIFTY", "NIFTY50", "NSEI"]: return "EODHD", "NSEI.INDX"
-    if clean_sym in["BANKNIFTY", "NIFTYBANK", "NSEBANK"]: return "EODHD", "NSEBANK.INDX"
-    if clean_sym in ["SENSEX", "BSESN"]: return "EODHD", "BSESN.INDX"
-    if clean_sym in["SPX", "S&P500", "GSPC"]: return "EODHD", "GSPC.INDX"
-    if clean_sym in ["NDX", "NASDAQ"]: return "EODHD", "NDX.INDX"
-    if clean_sym in ["DOW", "DJI", "DOWJONES"]: return "EODHD", "DJI.INDX"
-    if ".INDX" in s: return "EODHD", s
-
-    if "." not in s: return "EODHD", f"{s}.NSE"
-    if ".NS" in s: return "EODHD", s.replace(".NS", ".NSE")
-    if ".BO" in s: return "EODHD", s.replace(".BO", ".BSE")
-    
-    return "EODHD", s
+# Alias tables + classifier shared with the chart resolver
+from ..services.symbol_resolver import identify_asset_class, lookup_known_symbol
 
 # ==========================================
 # 3. AI & SEARCH ENDPOINTS
@@ -131,7 +100,7 @@ async def get_stock_autocomplete(query: str = Query(..., min_length=1)):
     cached = await redis_service.redis_client.get_cache(cache_key)
     if cached: return cached
 
-    results = await asyncio.to_thread(fmp_service.search_ticker, query, limit=25)
+    results = await fmp_service.search_ticker_async(query, limit=25)
     if not results: return []
 
     nse_stocks, bse_stocks, us_stocks, others = [], [], [], []
@@ -152,45 +121,87 @@ async def get_stock_autocomplete(query: str = Query(..., min_length=1)):
     await redis_service.redis_client.set_cache(cache_key, final_list, 86400)
     return final_list
 
+# Unknown queries are cached as misses for a short window so a bad ticker
+# doesn't re-hit FMP + Gemini on every keystroke, yet isn't pinned for a day.
+SEARCH_MISS_TTL = 300
+SEARCH_HIT_TTL = 86400
+
+# --- SEARCH RESULT LRU (Per Worker, in front of Redis) ---
+# Repeat lookups are a dict hit: no Redis round-trip / JSON decode.
+SEARCH_LOCAL_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+SEARCH_LOCAL_MAX = 4096
+SEARCH_LOCAL_TTL = 3600
+
+def get_local_search(key: str):
+    hit = SEARCH_LOCAL_CACHE.get(key)
+    if not hit: return None
+    expires_at, res = hit
+    if time.monotonic() > expires_at:
+        SEARCH_LOCAL_CACHE.pop(key, None)
+        return None
+    SEARCH_LOCAL_CACHE.move_to_end(key)
+    return res
+
+def set_local_search(key: str, res: dict):
+    ttl = SEARCH_LOCAL_TTL if res.get("symbol") else SEARCH_MISS_TTL
+    SEARCH_LOCAL_CACHE[key] = (time.monotonic() + ttl, res)
+    SEARCH_LOCAL_CACHE.move_to_end(key)
+    while len(SEARCH_LOCAL_CACHE) > SEARCH_LOCAL_MAX:
+        SEARCH_LOCAL_CACHE.popitem(last=False)
+
+async def cache_search(key: str, res: dict, ttl: int = SEARCH_HIT_TTL):
+    set_local_search(key, res)
+    await redis_service.redis_client.set_cache(key, res, ttl)
+    return res
+
 @router.get("/search")
 async def search_stock_ticker(query: str = Query(..., min_length=2)):
-    cache_key = f"search_v4_{query.lower().strip()}"
-    cached = await redis_service.redis_client.get_cache(cache_key)
-    if cached: return cached
+    norm = query.lower().strip()
+    cache_key = f"search_v4_{norm}"
+    cached = get_local_search(cache_key)
+    if cached is None:
+        cached = await redis_service.redis_client.get_cache(cache_key)
+        if cached: set_local_search(cache_key, cached)
+    if cached:
+        if not cached.get("symbol"): raise HTTPException(status_code=404, detail="Ticker not found")
+        return cached
     
     source, ticker = identify_asset_class(query) 
 
-    results = fmp_service.search_ticker(query)
-    if results: 
-        res = {"symbol": results[0]['symbol']}
-        await redis_service.redis_client.set_cache(cache_key, res, 86400) 
-        return res
+    results = await fmp_service.search_ticker_async(query)
+    if results: return await cache_search(cache_key, {"symbol": results[0]['symbol']})
 
-    ticker = gemini_service.get_ticker_from_query(query)
+    # FMP found nothing -> known listing is one set probe, no Gemini round-trip
+    known = lookup_known_symbol(query)
+    if known: return await cache_search(cache_key, {"symbol": known})
+
+    # Concurrent identical queries share one Gemini call
+    ticker = await redis_service.singleflight(f"gemini_ticker_{norm}", lambda: gemini_service.get_ticker_from_query_async(query))
     if ticker not in ["NOT_FOUND", "ERROR"]:
-        res = {"symbol": ticker}
-        await redis_service.redis_client.set_cache(cache_key, res, 86400)
-        return res
+        return await cache_search(cache_key, {"symbol": ticker})
+    if ticker == "NOT_FOUND":
+        await cache_search(cache_key, {"symbol": None}, SEARCH_MISS_TTL)
     raise HTTPException(status_code=404, detail="Ticker not found")
 
 # --- AI ANALYSIS WRAPPERS ---
 
+# Built before /all cached the master data -> placeholder result, retried soon instead of pinned
+MASTERLESS_TTL = 300
+
 @router.post("/{symbol}/swot")
 async def get_swot_analysis(symbol: str, request_data: SwotRequest = Body(...)):
-    cache_key = f"swot_v4_{symbol}"
-    cached = await redis_service.redis_client.get_cache(cache_key)
+    # Per (symbol, day): the inputs are daily fundamentals
+    cache_key = f"swot_v5_{symbol}_{date.today().isoformat()}"
+    # GRAB EXISTING DATA FROM CACHE (0 API Calls!) - result + master data in ONE round-trip
+    cached, master_data = await redis_service.redis_client.get_many([cache_key, f"all_data_v32_{symbol}"])
     if cached: return cached
     
-    # GRAB EXISTING DATA FROM CACHE (0 API Calls!)
-    master_data_key = f"all_data_v31_{symbol}"
-    master_data = await redis_service.redis_client.get_cache(master_data_key)
-    
     # GENERATE SWOT VIA MATH ENGINE
     from ..services import swot_engine
     swot_analysis = swot_engine.generate_algorithmic_swot(request_data.companyName, master_data)
     
     res = {"swot_analysis": swot_analysis}
-    await redis_service.redis_client.set_cache(cache_key, res, 3600)
+    await redis_service.redis_client.set_cache(cache_key, res, 86400 if master_data else MASTERLESS_TTL)
     return res
 
 @router.post("/{symbol}/forecast-analysis")
@@ -198,41 +209,35 @@ async def get_forecast_analysis(symbol: str, d: ForecastRequest = Body(...)):
     cache_key = f"fc_v2_{symbol}"
     cached = await redis_service.redis_client.get_cache(cache_key)
     if cached: return cached
-    analysis = await asyncio.to_thread(gemini_service.generate_forecast_analysis, d.companyName, d.analystRatings, d.priceTarget, d.keyStats, d.newsHeadlines, d.currency)
+    analysis = await gemini_service.generate_forecast_analysis_async(d.companyName, d.analystRatings, d.priceTarget, d.keyStats, d.newsHeadlines, d.currency)
     res = {"analysis": analysis}; await redis_service.redis_client.set_cache(cache_key, res, 3600); return res
 
 @router.post("/{symbol}/fundamental-analysis")
 async def get_fundamental_analysis(symbol: str, d: FundamentalRequest = Body(...)):
     cache_key = f"fa_v4_{symbol}"
-    cached = await redis_service.redis_client.get_cache(cache_key)
+    # ZERO API CALLS - Use Cached Master Data (fetched with the result in ONE round-trip)
+    cached, master_data = await redis_service.redis_client.get_many([cache_key, f"all_data_v32_{symbol}"])
     if cached: return cached
     
-    # ZERO API CALLS - Use Cached Master Data
-    master_data_key = f"all_data_v31_{symbol}"
-    master_data = await redis_service.redis_client.get_cache(master_data_key)
-    
     from ..services import strategy_engine
     assessment = strategy_engine.generate_value_philosophy(master_data)
     
     res = {"assessment": assessment}
-    await redis_service.redis_client.set_cache(cache_key, res, 86400)
+    await redis_service.redis_client.set_cache(cache_key, res, 86400 if master_data else MASTERLESS_TTL)
     return res
 
 @router.post("/{symbol}/canslim-analysis")
 async def get_canslim_analysis(symbol: str, d: CanslimRequest = Body(...)):
     cache_key = f"can_v4_{symbol}"
-    cached = await redis_service.redis_client.get_cache(cache_key)
+    # ZERO API CALLS - Use Cached Master Data (fetched with the result in ONE round-trip)
+    cached, master_data = await redis_service.redis_client.get_many([cache_key, f"all_data_v32_{symbol}"])
     if cached: return cached
     
-    # ZERO API CALLS - Use Cached Master Data
-    master_data_key = f"all_data_v31_{symbol}"
-    master_data = await redis_service.redis_client.get_cache(master_data_key)
-    
     from ..services import strategy_engine
     assessment = strategy_engine.generate_canslim_check(master_data)
     
     res = {"assessment": assessment}
-    await redis_service.redis_client.set_cache(cache_key, res, 3600)
+    await redis_service.redis_client.set_cache(cache_key, res, 3600 if master_data else MASTERLESS_TTL)
     return res
 
 @router.post("/{symbol}/conclusion-analysis")
@@ -260,6 +265,23 @@ async def get_conclusion_analysis(symbol: str, d: ConclusionRequest = Body(...))
 # 4. TECHNICAL ANALYSIS & CHART ENGINE
 # ==========================================
 
+async def fetch_base_chart(symbol: str, source: str, ticker: str, lookup_range: str, ttl: int = 300):
+    """
+    One master series per (symbol, range): 5M for every intraday timeframe, or the EOD range.
+    All timeframe endpoints resample this locally, so switching timeframes never re-hits the API.
+    """
+    cache_key = f"chart_base_v17_{symbol}_{lookup_range}"
+    chart_list = await redis_service.redis_client.get_cache(cache_key)
+    if chart_list: return chart_list
+
+    if source == "FMP":
+        chart_list = await fmp_service.get_market_history_async(ticker, lookup_range)
+    else:
+        chart_list = await eodhd_service.get_historical_data_async(ticker, lookup_range)
+
+    if chart_list: await redis_service.redis_client.set_cache(cache_key, chart_list, ttl)
+    return chart_list
+
 @router.post("/{symbol}/timeframe-analysis")
 async def get_timeframe_analysis(symbol: str, request_data: TimeframeRequest = Body(...)):
     source, ticker = identify_asset_class(symbol)
@@ -267,28 +289,14 @@ async def get_timeframe_analysis(symbol: str, request_data: TimeframeRequest = B
     is_intraday_request = request_data.timeframe.upper() in["5M", "15M", "30M", "1H", "4H"]
     lookup_range = "5M" if is_intraday_request else request_data.timeframe
 
-    cache_key = f"chart_base_v17_{symbol}_{lookup_range}" 
-    chart_list = await redis_service.redis_client.get_cache(cache_key)
-    
-    if not chart_list:
-        if source == "FMP":
-            chart_list = await asyncio.to_thread(fmp_service.get_commodity_history, ticker, lookup_range)
-            if not chart_list: chart_list = await asyncio.to_thread(fmp_service.get_crypto_history, ticker, lookup_range)
-        else:
-            chart_list = await asyncio.to_thread(eodhd_service.get_historical_data, ticker, lookup_range)
-        
-        if chart_list: await redis_service.redis_client.set_cache(cache_key, chart_list, 300)
+    chart_list = await fetch_base_chart(symbol, source, ticker, lookup_range)
 
     # THE INTELLIGENT FALLBACK
     if not chart_list or len(chart_list) < 20:
         if is_intraday_request:
             # If 5M fails (Crypto Free Tier), instantly fetch Daily data instead!
-            print(f"âš ï¸ Intraday failed for {ticker}. Falling back to Daily Analysis.")
-            cache_key_1d = f"chart_base_v17_{symbol}_1D"
-            chart_list = await redis_service.redis_client.get_cache(cache_key_1d)
-            if not chart_list:
-                chart_list = await asyncio.to_thread(eodhd_service.get_historical_data, ticker, "1D")
-                if chart_list: await redis_service.redis_client.set_cache(cache_key_1d, chart_list, 43200)
+            logger.warning("⚠️ Intraday failed for %s. Falling back to Daily Analysis.", ticker)
+            chart_list = await fetch_base_chart(symbol, source, ticker, "1D", ttl=43200)
     
     # If it STILL fails after the fallback, send the perfect Error Ticket
     if not chart_list or len(chart_list) < 20:
@@ -308,14 +316,9 @@ RISK_REWARD: N/A
 CONFIDENCE: Low (Missing Data)
 RATIONALE: The data provider does not supply enough candles for this asset."""}
          
-    # Mathematical Resampling
-    if is_intraday_request and request_data.timeframe.upper() != "5M":
-         chart_list = technical_service.resample_chart_data(chart_list, request_data.timeframe)
-
-    df = pd.DataFrame(chart_list)
-    technicals = technical_service.calculate_technical_indicators(df)
-    pivots = technical_service.calculate_pivot_points(df)
-    mas = technical_service.calculate_moving_averages(df)
+    # Mathematical Resampling + indicators on the TA pool
+    resample_to = request_data.timeframe if is_intraday_request and request_data.timeframe.upper() != "5M" else None
+    _, technicals, pivots, mas = await technical_service.run_ta(technical_service.indicator_bundle, chart_list, resample_to)
     
     analysis = quant_engine.generate_algorithmic_report(symbol, request_data.timeframe, technicals, pivots, mas)
     return {"analysis": analysis}
@@ -329,26 +332,12 @@ async def get_technical_score(symbol: str, request_data: TimeframeRequest = Body
     is_intraday_request = request_data.timeframe.upper() in["5M", "15M", "30M", "1H", "4H"]
     lookup_range = "5M" if is_intraday_request else request_data.timeframe
     
-    cache_key = f"chart_base_v17_{symbol}_{lookup_range}"
-    chart_list = await redis_service.redis_client.get_cache(cache_key)
-
-    if not chart_list:
-        if source == "FMP":
-            chart_list = await asyncio.to_thread(fmp_service.get_commodity_history, ticker, range_type=lookup_range)
-            if not chart_list: chart_list = await asyncio.to_thread(fmp_service.get_crypto_history, ticker, request_data.timeframe)
-        else:
-            chart_list = await asyncio.to_thread(eodhd_service.get_historical_data, ticker, range_type=lookup_range)
-        
-        if chart_list:
-             await redis_service.redis_client.set_cache(cache_key, chart_list, 300)
+    chart_list = await fetch_base_chart(symbol, source, ticker, lookup_range)
 
     if not chart_list: return {"score": 50, "label": "Neutral"}
     
-    if is_intraday_request and request_data.timeframe.upper() != "5M":
-         chart_list = technical_service.resample_chart_data(chart_list, request_data.timeframe)
-
-    df = pd.DataFrame(chart_list)
-    techs = technical_service.calculate_technical_indicators(df)
+    resample_to = request_data.timeframe if is_intraday_request and request_data.timeframe.upper() != "5M" else None
+    _, techs, _, _ = await technical_service.run_ta(technical_service.indicator_bundle, chart_list, resample_to)
     sentiment = sentiment_service.calculate_technical_sentiment(techs)
     return sentiment
 
@@ -364,30 +353,17 @@ async def get_technicals_data(symbol: str, request_data: TimeframeRequest = Body
     lookup_range = "5M" if is_intraday_request else request_data.timeframe
     
     # Check Cache for Master Data
-    cache_key = f"chart_base_v17_{symbol}_{lookup_range}"
-    chart_list = await redis_service.redis_client.get_cache(cache_key)
-
-    if not chart_list:
-        if source == "FMP":
-            chart_list = await asyncio.to_thread(fmp_service.get_commodity_history, ticker, range_type=lookup_range)
-            if not chart_list: chart_list = await asyncio.to_thread(fmp_service.get_crypto_history, ticker, request_data.timeframe)
-        else:
-            chart_list = await asyncio.to_thread(eodhd_service.get_historical_data, ticker, range_type=lookup_range)
-        
-        if chart_list:
-             await redis_service.redis_client.set_cache(cache_key, chart_list, 300)
+    chart_list = await fetch_base_chart(symbol, source, ticker, lookup_range)
 
     if not chart_list: return {"error": "No data available"}
     
-    # Math Resampling
-    if is_intraday_request and request_data.timeframe.upper() != "5M":
-         chart_list = technical_service.resample_chart_data(chart_list, request_data.timeframe)
-
-    df = pd.DataFrame(chart_list)
+    # Math Resampling + indicators on the TA pool
+    resample_to = request_data.timeframe if is_intraday_request and request_data.timeframe.upper() != "5M" else None
+    _, technicals, pivots, mas = await technical_service.run_ta(technical_service.indicator_bundle, chart_list, resample_to)
     return {
-        "technicalIndicators": technical_service.calculate_technical_indicators(df),
-        "pivotPoints": technical_service.calculate_pivot_points(df),
-        "movingAverages": technical_service.calculate_moving_averages(df)
+        "technicalIndicators": technicals,
+        "pivotPoints": pivots,
+        "movingAverages": mas
     }
 
 # ==========================================
@@ -410,21 +386,29 @@ async def get_peers_comparison(symbol: str):
     is_indian = ".NS" in symbol or ".BO" in symbol
     peers =[]
 
+    # FMP peers go out immediately: the US answer, and for India the fallback is already
+    # in flight while the fundamentals -> Gemini chain runs (max of the two, not the sum)
+    fmp_peers_task = asyncio.create_task(fmp_service.get_stock_peers_async(ticker))
+
     # 1. Indian Context Routing (AI First)
     if is_indian:
-        base_profile = await asyncio.to_thread(eodhd_service.get_company_fundamentals, ticker)
-        general = base_profile.get('General', {})
-        name = general.get('Name', ticker)
-        sector = general.get('Sector', '')
-        industry = general.get('Industry', '')
-        
-        peers_str = await asyncio.to_thread(gemini_service.find_peer_tickers_by_industry, name, sector, industry, "India")
-        if peers_str:
-            peers =[p.strip().upper() for p in peers_str.split(',') if p.strip()]
+        try:
+            base_profile = await eodhd_service.get_company_fundamentals_async(ticker)
+            general = base_profile.get('General', {})
+            name = general.get('Name', ticker)
+            sector = general.get('Sector', '')
+            industry = general.get('Industry', '')
+            
+            peers_str = await gemini_service.find_peer_tickers_by_industry_async(name, sector, industry, "India")
+            if peers_str:
+                peers =[p.strip().upper() for p in peers_str.split(',') if p.strip()]
+        except BaseException:
+            fmp_peers_task.cancel()
+            raise
 
     # 2. US Context Routing (FMP First)
-    if not peers:
-        peers = await asyncio.to_thread(fmp_service.get_stock_peers, ticker)
+    if peers: fmp_peers_task.cancel()
+    else: peers = await fmp_peers_task
 
     if not peers: return[]
 
@@ -445,12 +429,14 @@ async def get_peers_comparison(symbol: str):
 
     target_symbols = all_symbols[:6]
 
-    # 4. Fetch Live Data
-    raw_data = await asyncio.to_thread(fmp_service.get_crypto_real_time_bulk, target_symbols)
-    if not raw_data: return []
+    # 4. Fetch Live Data (every ticker in ONE batched quote call, rows kept in our order)
+    quotes = await fmp_service.get_quotes_batch_async(target_symbols)
+    if not quotes: return []
 
     final_data =[]
-    for item in raw_data:
+    for s in target_symbols:
+        item = quotes.get(s)
+        if not item: continue
         final_data.append({
             "symbol": item.get('symbol'),
             "marketCap": item.get('marketCap'),
@@ -472,21 +458,26 @@ async def get_stock_chart(symbol: str, range: str = "1D"):
     
     cache_key = f"chart_base_v17_{symbol}_{lookup_range}"
     ttl = 300 if is_intraday_derived else 43200
+
+    # Live quote goes out now, overlapping the history fetch (1 RTT on a miss, not 2)
+    quote_coro = fmp_service.get_quote_async(fmp_ticker) if source == "FMP" else eodhd_service.get_live_price_async(symbol)
+    quote_task = asyncio.create_task(quote_coro)
     
     chart_data = await redis_service.redis_client.get_cache(cache_key)
     if not chart_data:
+        # Native async over the shared keep-alive pool (no thread hop, no handshake per call)
         if source == "FMP":
-            chart_data = await asyncio.to_thread(fmp_service.get_commodity_history, fmp_ticker, range_type=lookup_range)
-            if not chart_data:
-                 chart_data = await asyncio.to_thread(fmp_service.get_crypto_history, fmp_ticker, range_type=lookup_range)
+            chart_data = await fmp_service.get_market_history_async(fmp_ticker, lookup_range)
             if not chart_data:
-                chart_data = await asyncio.to_thread(eodhd_service.get_historical_data, symbol, range_type=lookup_range)
+                chart_data = await eodhd_service.get_historical_data_async(symbol, lookup_range)
         else:
-            chart_data = await asyncio.to_thread(eodhd_service.get_historical_data, symbol, range_type=lookup_range)
+            chart_data = await eodhd_service.get_historical_data_async(symbol, lookup_range)
         if chart_data:
             await redis_service.redis_client.set_cache(cache_key, chart_data, ttl)
     
-    if not chart_data: return []
+    if not chart_data:
+        quote_task.cancel()
+        return []
     final_data = chart_data
     
     # Resample for Display
@@ -496,15 +487,11 @@ async def get_stock_chart(symbol: str, range: str = "1D"):
 
     # Live Price Stitching
     try:
-        current_price = 0
-        if source == "FMP":
-            q = await asyncio.to_thread(fmp_service.get_quote, fmp_ticker)
-            current_price = q.get('price')
-        else:
-            q = await asyncio.to_thread(eodhd_service.get_live_price, symbol)
-            current_price = q.get('price')
+        q = await quote_task
+        current_price = q.get('price')
         if current_price and final_data:
-            last = final_data[-1]
+            final_data = list(final_data)
+            last = final_data[-1] = dict(final_data[-1])  # Never mutate the cached series
             last['close'] = current_price
             if current_price > last['high']: last['high'] = current_price
             if current_price < last['low']: last['low'] = current_price
@@ -512,35 +499,150 @@ async def get_stock_chart(symbol: str, range: str = "1D"):
 
     return final_data
 
+# --- NEWS (Secondary request, off the /all critical path) ---
+# NewsAPI is the slowest upstream and nothing on first paint needs it: the page
+# fetches it in parallel with /all instead of /all waiting on it.
+NEWS_TTL = 300
+
+@router.get("/{symbol}/news")
+async def get_stock_news(symbol: str):
+    cache_key = f"news_v1_{symbol}"
+    cached = await redis_service.redis_client.get_cache_raw(cache_key)
+    if cached: return raw_json_response(cached)
+    return raw_json_response(await redis_service.singleflight(cache_key, lambda: build_stock_news(symbol, cache_key)))
+
+async def build_stock_news(symbol: str, cache_key: str):
+    articles = await news_service.get_company_news_async(symbol)
+    if not isinstance(articles, list): articles = []  # missing key -> error dict
+    payload = dumps(articles)
+    # Empty result (upstream hiccup) is retried sooner
+    await redis_service.redis_client.set_cache_raw(cache_key, payload, redis_service.jittered_ttl(NEWS_TTL if articles else 60))
+    return payload
+
+# --- MASTER DATA CACHE ---
+# Fresh copy for 5 min. The last good copy is also kept for a day and served when
+# the upstreams fail (no live quote / exception) instead of an empty page or a 500.
+ALL_DATA_TTL = 300
+ALL_DATA_STALE_TTL = 86400
+ALL_DATA_DEGRADED_TTL = 60
+
 @router.get("/{symbol}/all")
 async def get_all_stock_data(symbol: str):
-    cache_key = f"all_data_v31_{symbol}"
-    cached = await redis_service.redis_client.get_cache(cache_key)
+    cache_key = f"all_data_v32_{symbol}"
+    cached = await redis_service.redis_client.get_cache_raw(cache_key)
+    if cached: return raw_json_response(cached)
+    try:
+        # One build per symbol across ALL workers (per-worker single-flight + Redis build lock)
+        return raw_json_response(await redis_service.coalesced_build(cache_key, lambda: build_all_stock_data(symbol, cache_key)))
+    except Exception as e:
+        logger.warning("⚠️ /all build failed for %s: %s", symbol, e)
+        stale = await redis_service.redis_client.get_cache_raw(f"all_stale_v32_{symbol}")
+        if stale: return raw_json_response(stale)
+        raise HTTPException(status_code=502, detail="Market data unavailable")
+
+# --- SLOW TIER (Fundamentals) ---
+# Statements, holders, analyst data and the scores derived from them move once a
+# quarter, not once a tick. They are parsed + scored once and cached for 6h, so an
+# /all rebuild (every 5 min) only refetches the quote + candles.
+ALL_SLOW_TTL = 21600
+
+def parse_fundamentals_tier(symbol: str, raw: dict):
+    def safe(k, d=None):
+        val = raw.get(k)
+        if isinstance(val, Exception) or val is None: return d
+        return val
+
+    eod_fund = safe('eod_fund', {})
+    eod_p = eodhd_service.parse_profile_from_fundamentals(eod_fund, symbol)
+    fmp_p = safe('fmp_prof', {}) or {}
+    tv_symbol = symbol
+    if symbol in TRADINGVIEW_OVERRIDE_MAP: tv_symbol = TRADINGVIEW_OVERRIDE_MAP[symbol]
+    elif symbol.endswith(".NS"): tv_symbol = "NSE:" + symbol.replace(".NS", "")
+
+    data = {}
+    data['profile'] = {**eod_p, "description": fmp_p.get("description") or eod_p.get("description"), "image": fmp_p.get("image") or eod_p.get("image"), "tradingview_symbol": tv_symbol}
+    data['key_metrics'] = eodhd_service.parse_metrics_from_fundamentals(eod_fund)
+    data['annual_revenue_and_profit'] = eodhd_service.parse_financials(eod_fund, 'Financials::Income_Statement', 'yearly')
+    data['annual_balance_sheets'] = eodhd_service.parse_financials(eod_fund, 'Financials::Balance_Sheet', 'yearly')
+    data['annual_cash_flow_statements'] = eodhd_service.parse_financials(eod_fund, 'Financials::Cash_Flow', 'yearly')
+    data['quarterly_income_statements'] = eodhd_service.parse_financials(eod_fund, 'Financials::Income_Statement', 'quarterly')
+    data['quarterly_balance_sheets'] = eodhd_service.parse_financials(eod_fund, 'Financials::Balance_Sheet', 'quarterly')
+    data['quarterly_cash_flow_statements'] = eodhd_service.parse_financials(eod_fund, 'Financials::Cash_Flow', 'quarterly')
+    share_bd = eodhd_service.parse_shareholding_breakdown(eod_fund)
+    shares = eodhd_service.parse_holders(eod_fund)
+    if share_bd.get('promoter') == 0:
+        fmp_s = safe('shareholding', [])
+        if fmp_s:
+            t = sum(h.get('shares', 0) for h in fmp_s)
+            share_bd = {"promoter": 0, "fii": t*0.6, "dii": t*0.4, "public": 0}
+            shares = fmp_s
+    data['shareholding'] = shares
+    data['shareholding_breakdown'] = share_bd
+    data['piotroski_f_score'] = fundamental_service.calculate_piotroski_f_score(data['annual_revenue_and_profit'], data['annual_balance_sheets'], data['annual_cash_flow_statements'])
+    data['graham_scan'] = fundamental_service.calculate_graham_scan(data['profile'], data['key_metrics'], data['annual_revenue_and_profit'], data['annual_cash_flow_statements'])
+
+    eod_ratings, eod_targets = eodhd_service.parse_analyst_data(eod_fund) if hasattr(eodhd_service, 'parse_analyst_data') else ([], {})
+    return {
+        "data": data,
+        "eod_ratings": eod_ratings, "eod_targets": eod_targets,
+        "fmp_ratings": safe('fmp_rating', []), "fmp_targets": safe('fmp_target', {}),
+        "has_fundamentals": bool(eod_fund)
+    }
+
+async def fetch_fundamentals_tier(symbol: str):
+    slow_key = f"all_slow_v1_{symbol}"
+    cached = await redis_service.redis_client.get_cache(slow_key)
     if cached: return cached
 
+    # Async clients share one keep-alive pool (no thread hop / handshake per call)
+    tasks = {
+        "eod_fund": eodhd_service.get_company_fundamentals_async(symbol),
+        "fmp_prof": fmp_service.get_company_profile_async(symbol),
+        "fmp_rating": fmp_service.get_analyst_ratings_async(symbol),
+        "fmp_target": fmp_service.get_price_target_consensus_async(symbol),
+        "shareholding": fmp_service.get_shareholding_data_async(symbol),
+    }
+    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    # Statement frames + Piotroski/Graham are pandas work -> TA pool, loop stays free
+    slow = await technical_service.run_ta(parse_fundamentals_tier, symbol, dict(zip(tasks.keys(), results)))
+    # Only a real fundamentals payload is worth pinning for hours
+    if slow["has_fundamentals"]:
+        await redis_service.redis_client.set_cache_jittered(slow_key, slow, ALL_SLOW_TTL)
+    return slow
+
+async def history_with_ta(symbol: str):
+    """
+    Daily candles + indicator bundle chained in one task: the TA starts on the TA pool
+    as soon as the candles land, while the quote / fundamentals are still in flight.
+    """
+    chart_data = await eodhd_service.get_historical_data_async(symbol, "1D")
+    bundle = None
+    if chart_data and len(chart_data) > 20:
+        try: bundle = await technical_service.run_ta(technical_service.indicator_bundle, chart_data)
+        except Exception: pass
+    return chart_data, bundle
+
+async def build_all_stock_data(symbol: str, cache_key: str):
     source, fmp_ticker = identify_asset_class(symbol)
-    tasks = { "news": asyncio.to_thread(news_service.get_company_news, symbol) }
+    tasks = {}
 
     if source == "FMP":
         tasks.update({
-            "fmp_quote": asyncio.to_thread(fmp_service.get_quote, fmp_ticker),
-            "chart_data": asyncio.to_thread(fmp_service.get_commodity_history, fmp_ticker, "1D") 
+            "fmp_quote": fmp_service.get_quote_async(fmp_ticker),
+            "chart_data": fmp_service.get_commodity_history_async(fmp_ticker, "1D") 
         })
     else:
+        # Fast tier (quote + candles) every rebuild; the slow tier is usually a cache hit
         tasks.update({
-            "eod_fund": asyncio.to_thread(eodhd_service.get_company_fundamentals, symbol),
-            "eod_live": asyncio.to_thread(eodhd_service.get_live_price, symbol),
-            "fmp_prof": asyncio.to_thread(fmp_service.get_company_profile, symbol),
-            "fmp_rating": asyncio.to_thread(fmp_service.get_analyst_ratings, symbol),
-            "fmp_target": asyncio.to_thread(fmp_service.get_price_target_consensus, symbol),
-            "shareholding": asyncio.to_thread(fmp_service.get_shareholding_data, symbol),
-            "chart_data": asyncio.to_thread(eodhd_service.get_historical_data, symbol, "1D")
+            "slow": fetch_fundamentals_tier(symbol),
+            "eod_live": eodhd_service.get_live_price_async(symbol),
+            "chart_data": history_with_ta(symbol)
         })
 
     try:
         results = await asyncio.gather(*tasks.values(), return_exceptions=True)
         raw = dict(zip(tasks.keys(), results))
-    except: raw = {}
+    except Exception: raw = {}
 
     def safe(k, d=None):
         val = raw.get(k)
@@ -548,10 +650,20 @@ async def get_all_stock_data(symbol: str):
         return val
 
     final_data = {}
+    ta_bundle = None
 
     if source == "FMP":
         q = safe('fmp_quote', {})
-        if not q: q = await asyncio.to_thread(eodhd_service.get_live_price, symbol)
+        chart_data = safe('chart_data', [])
+
+        # Fallbacks for whatever came back empty go out together, not one after another
+        fallbacks = {}
+        if not q: fallbacks["quote"] = eodhd_service.get_live_price_async(symbol)
+        if not chart_data: fallbacks["chart"] = fmp_service.get_crypto_history_async(fmp_ticker, "1D")
+        if fallbacks:
+            fb = dict(zip(fallbacks.keys(), await asyncio.gather(*fallbacks.values(), return_exceptions=True)))
+            if "quote" in fb: q = fb["quote"] if isinstance(fb["quote"], dict) else {}
+            if "chart" in fb and not isinstance(fb["chart"], Exception): chart_data = fb["chart"] or []
 
         final_data['profile'] = {
             "companyName": q.get('name') or symbol, 
@@ -561,11 +673,9 @@ async def get_all_stock_data(symbol: str):
         }
         final_data['quote'] = q
         
-        chart_data = safe('chart_data', [])
+        # Last resort only when both FMP history sources came back empty
         if not chart_data:
-             chart_data = await asyncio.to_thread(fmp_service.get_crypto_history, fmp_ticker, "1D")
-        if not chart_data:
-             chart_data = await asyncio.to_thread(eodhd_service.get_historical_data, symbol, "1D")
+             chart_data = await eodhd_service.get_historical_data_async(symbol, "1D")
 
         # --- SAFE INITIALIZATION ---
         final_data['key_metrics'] = {} 
@@ -577,72 +687,41 @@ async def get_all_stock_data(symbol: str):
         final_data['quarterly_cash_flow_statements'] = []
         final_data['shareholding'] = []
         final_data['shareholding_breakdown'] = {}
+        final_data['piotroski_f_score'] = {}
+        final_data['graham_scan'] = {}
         eod_ratings, eod_targets, fmp_ratings, fmp_targets = [], {}, [], {}
         
     else:
-        # STOCK LOGIC
-        eod_fund = safe('eod_fund', {})
-        eod_p = eodhd_service.parse_profile_from_fundamentals(eod_fund, symbol)
-        fmp_p = safe('fmp_prof', {}) or {}
-        tv_symbol = symbol
-        if symbol in TRADINGVIEW_OVERRIDE_MAP: tv_symbol = TRADINGVIEW_OVERRIDE_MAP[symbol]
-        elif symbol.endswith(".NS"): tv_symbol = "NSE:" + symbol.replace(".NS", "")
-        
-        final_data['profile'] = {**eod_p, "description": fmp_p.get("description") or eod_p.get("description"), "image": fmp_p.get("image") or eod_p.get("image"), "tradingview_symbol": tv_symbol}
-        final_data['key_metrics'] = eodhd_service.parse_metrics_from_fundamentals(eod_fund)
+        # STOCK LOGIC (parsed statements + scores come ready-made from the slow tier)
+        slow = safe('slow') or parse_fundamentals_tier(symbol, {})
+        final_data.update(slow['data'])
         final_data['quote'] = safe('eod_live', {})
-        final_data['annual_revenue_and_profit'] = eodhd_service.parse_financials(eod_fund, 'Financials::Income_Statement', 'yearly')
-        final_data['annual_balance_sheets'] = eodhd_service.parse_financials(eod_fund, 'Financials::Balance_Sheet', 'yearly')
-        final_data['annual_cash_flow_statements'] = eodhd_service.parse_financials(eod_fund, 'Financials::Cash_Flow', 'yearly')
-        final_data['quarterly_income_statements'] = eodhd_service.parse_financials(eod_fund, 'Financials::Income_Statement', 'quarterly')
-        final_data['quarterly_balance_sheets'] = eodhd_service.parse_financials(eod_fund, 'Financials::Balance_Sheet', 'quarterly')
-        final_data['quarterly_cash_flow_statements'] = eodhd_service.parse_financials(eod_fund, 'Financials::Cash_Flow', 'quarterly')
-        chart_data = safe('chart_data', [])
-        share_bd = eodhd_service.parse_shareholding_breakdown(eod_fund)
-        shares = eodhd_service.parse_holders(eod_fund)
-        if share_bd.get('promoter') == 0:
-            fmp_s = safe('shareholding', [])
-            if fmp_s:
-                t = sum(h.get('shares', 0) for h in fmp_s)
-                share_bd = {"promoter": 0, "fii": t*0.6, "dii": t*0.4, "public": 0}
-                shares = fmp_s
-        final_data['shareholding'] = shares
-        final_data['shareholding_breakdown'] = share_bd
-        eod_ratings, eod_targets = eodhd_service.parse_analyst_data(eod_fund) if hasattr(eodhd_service, 'parse_analyst_data') else ([], {})
-        fmp_ratings, fmp_targets = safe('fmp_rating', []), safe('fmp_target', {})
+        chart_data, ta_bundle = safe('chart_data', ([], None))
+        eod_ratings, eod_targets = slow['eod_ratings'], slow['eod_targets']
+        fmp_ratings, fmp_targets = slow['fmp_ratings'], slow['fmp_targets']
 
     tech_inds, mas, pivots, darvas = {}, {}, {}, {}
     if chart_data and len(chart_data) > 20:
         try:
-            df = pd.DataFrame(chart_data)
-            tech_inds = technical_service.calculate_technical_indicators(df)
-            mas = technical_service.calculate_moving_averages(df)
-            pivots = technical_service.calculate_pivot_points(df)
+            # Stocks: already computed alongside the fan-out (history_with_ta)
+            if ta_bundle is None: ta_bundle = await technical_service.run_ta(technical_service.indicator_bundle, chart_data)
+            df, tech_inds, pivots, mas = ta_bundle
             if source != "FMP" and final_data['quote']:
                 darvas = technical_service.calculate_darvas_box(df, final_data['quote'], final_data['profile'].get('currency', 'USD'))
-        except: pass
+        except Exception: pass
 
     final_data['technical_indicators'] = tech_inds
     final_data['moving_averages'] = mas
     final_data['pivot_points'] = pivots
     final_data['darvas_scan'] = darvas
 
-    piotroski, graham = {}, {}
-    if source != "FMP":
-        piotroski = fundamental_service.calculate_piotroski_f_score(final_data['annual_revenue_and_profit'], final_data['annual_balance_sheets'], final_data['annual_cash_flow_statements'])
-        graham = fundamental_service.calculate_graham_scan(final_data['profile'], final_data.get('key_metrics', {}), final_data['annual_revenue_and_profit'], final_data['annual_cash_flow_statements'])
-    
-    final_data['piotroski_f_score'] = piotroski
-    final_data['graham_scan'] = graham
-    
     # SAFE CALL
     final_data['overall_sentiment'] = sentiment_service.calculate_overall_sentiment(
-        piotroski.get('score'), 
+        final_data['piotroski_f_score'].get('score'), 
         final_data.get('key_metrics', {}), 
         tech_inds, 
-        safe('fmp_rating', [])
+        fmp_ratings or []
     )
-    final_data['news'] = safe('news', [])
 
     def has_votes(r): return r and isinstance(r, list) and len(r)>0 and (r[0].get('ratingBuy',0)+r[0].get('ratingHold',0)+r[0].get('ratingSell',0) > 0)
     
@@ -693,15 +772,59 @@ async def get_all_stock_data(symbol: str):
         if isinstance(obj, list): return [clean_json(v) for v in obj]
         return obj
 
-    final = clean_json(final_data)
-    await redis_service.redis_client.set_cache(cache_key, final, 300)
-    return final
+    # Serialized once: the same bytes go to Redis and to this response
+    payload = dumps(clean_json(final_data))
+    stale_key = f"all_stale_v32_{symbol}"
+    if final_data['quote']:
+        await asyncio.gather(
+            redis_service.redis_client.set_cache_raw(cache_key, payload, redis_service.jittered_ttl(ALL_DATA_TTL)),
+            redis_service.redis_client.set_cache_raw(stale_key, payload, ALL_DATA_STALE_TTL)
+        )
+        return payload
+
+    # No live quote = upstream outage / quota: prefer the last good snapshot
+    # (cached briefly either way, so other workers waiting on this build find it)
+    stale = await redis_service.redis_client.get_cache_raw(stale_key)
+    if stale: payload = stale
+    await redis_service.redis_client.set_cache_raw(cache_key, payload, ALL_DATA_DEGRADED_TTL)
+    return payload
 
 
 # ==========================================
 # 5. THE "OMNI-ANALYST" ENGINE (ALL TIMEFRAMES AT ONCE)
 # ==========================================
 
+# Fixed dispatch table, built once: (timeframe, response key, base series, resample target)
+OMNI_TIMEFRAMES = (
+    ("5M", "5m", "5M", None),
+    ("15M", "15m", "5M", "15M"),
+    ("1H", "1h", "5M", "1H"),
+    ("4H", "4h", "5M", "4H"),
+    ("1D", "1d", "1D", None),
+)
+
+def build_omni_frames(chart_5m: list, chart_1d: list):
+    # 5M feeds four timeframes -> one list-of-dicts conversion instead of four
+    return {
+        "5M": technical_service.candles_to_frame(chart_5m),
+        "1D": technical_service.candles_to_frame(chart_1d) if chart_1d else None,
+    }
+
+def analyze_timeframe(symbol: str, spec: tuple, frames: dict):
+    tf, key, base, resample_to = spec
+    try:
+        # Base frames are built once per request; derived timeframes resample frame -> frame
+        df = frames[base]
+        if df is None: return key, "Analysis unavailable."
+        if resample_to: df = technical_service.resample_frame(df, resample_to)
+        
+        techs = technical_service.calculate_technical_indicators(df)
+        pivots = technical_service.calculate_pivot_points(df)
+        mas = technical_service.calculate_moving_averages(df)
+        
+        return key, quant_engine.generate_algorithmic_report(symbol, tf, techs, pivots, mas)
+    except: return key, "Analysis unavailable."
+
 @router.post("/{symbol}/all-timeframe-analysis")
 async def get_all_timeframe_analysis(symbol: str):
     cache_key = f"omni_analysis_v7_{symbol}"
@@ -711,16 +834,13 @@ async def get_all_timeframe_analysis(symbol: str):
     source, ticker = identify_asset_class(symbol)
     
     # Concurrent Fetch: 5M (for intraday) and 1D (for macro/EMA accuracy)
-    if source == "FMP":
-        chart_5m = await asyncio.to_thread(fmp_service.get_commodity_history, ticker, "5M")
-        if not chart_5m: chart_5m = await asyncio.to_thread(fmp_service.get_crypto_history, ticker, "5M")
-        chart_1d = await asyncio.to_thread(fmp_service.get_commodity_history, ticker, "1D")
-        if not chart_1d: chart_1d = await asyncio.to_thread(fmp_service.get_crypto_history, ticker, "1D")
-        quote = await asyncio.to_thread(fmp_service.get_quote, ticker)
-    else:
-        chart_5m = await asyncio.to_thread(eodhd_service.get_historical_data, ticker, "5M")
-        chart_1d = await asyncio.to_thread(eodhd_service.get_historical_data, ticker, "1D")
-        quote = await asyncio.to_thread(eodhd_service.get_live_price, ticker)
+    # Shares the master series cache with the single-timeframe endpoints.
+    quote_fn = fmp_service.get_quote_async if source == "FMP" else eodhd_service.get_live_price_async
+    chart_5m, chart_1d, quote = await asyncio.gather(
+        fetch_base_chart(symbol, source, ticker, "5M"),
+        fetch_base_chart(symbol, source, ticker, "1D"),
+        quote_fn(ticker)
+    )
 
     if not chart_5m or len(chart_5m) < 50:
         return {"error": "Insufficient market data."}
@@ -729,6 +849,7 @@ async def get_all_timeframe_analysis(symbol: str):
 
     def stitch_live_price(data):
         if data and current_price:
+            data = list(data); data[-1] = dict(data[-1])  # Never mutate the cached series
             data[-1]['close'] = current_price
             if current_price > data[-1]['high']: data[-1]['high'] = current_price
             if current_price < data[-1]['low']: data[-1]['low'] = current_price
@@ -737,29 +858,14 @@ async def get_all_timeframe_analysis(symbol: str):
     chart_5m = stitch_live_price(chart_5m)
     chart_1d = stitch_live_price(chart_1d)
 
-    async def process_timeframe(tf):
-        try:
-            if tf == "1D": data = chart_1d
-            elif tf == "5M": data = chart_5m
-            else: data = technical_service.resample_chart_data(chart_5m, tf)
-            
-            df = pd.DataFrame(data)
-            techs = technical_service.calculate_technical_indicators(df)
-            pivots = technical_service.calculate_pivot_points(df)
-            mas = technical_service.calculate_moving_averages(df)
-            
-            analysis = await asyncio.to_thread(quant_engine.generate_algorithmic_report, symbol, tf, techs, pivots, mas)
-            return tf.lower(), analysis
-        except: return tf.lower(), "Analysis unavailable."
-
-    results = await asyncio.gather(
-        process_timeframe("5M"), process_timeframe("15M"),
-        process_timeframe("1H"), process_timeframe("4H"),
-        process_timeframe("1D")
-    )
-    
-    response_map = {k: v for k, v in results}
-    await redis_service.redis_client.set_cache(cache_key, response_map, 300)
+    # Framing + each timeframe is pure pandas math -> all of it runs on the TA pool, off the event loop
+    frames = await technical_service.run_ta(build_omni_frames, chart_5m, chart_1d)
+    # (key, report) tuples go straight into the dict -> one pass, no intermediate list
+    response_map = dict(await asyncio.gather(*[
+        technical_service.run_ta(analyze_timeframe, symbol, spec, frames)
+        for spec in OMNI_TIMEFRAMES
+    ]))
+    await redis_service.redis_client.set_cache_jittered(cache_key, response_map, 300)
     return response_map
 @router.get("/screener/configs")
 async def get_screener_configs():
@@ -772,10 +878,10 @@ async def get_dynamic_screener(screener_key: str):
     cached = await redis_service.redis_client.get_cache(cache_key)
     if cached: return cached
     
-    from ..services.chartink_engine import fetch_screener
-    results = await asyncio.to_thread(fetch_screener, screener_key)
+    from ..services.chartink_engine import fetch_screener_async
+    results = await fetch_screener_async(screener_key)
     if results and len(results) > 0:
-        await redis_service.redis_client.set_cache(cache_key, results, 300)
+        await redis_service.redis_client.set_cache_jittered(cache_key, results, 300)
     return results or[]
 
 
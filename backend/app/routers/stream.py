@@ -1,10 +1,12 @@
 import asyncio
+import logging
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 # Import the robust Stream Architecture
 from ..services.stream_hub import consumer, producer
-from ..services import eodhd_service, redis_service
+from ..services import eodhd_service, redis_service, technical_service, http_client
 
 router = APIRouter()
+logger = logging.getLogger("Stream")
 
 # ==========================================
 # 1. WEBSOCKET ENDPOINT (The Gateway)
@@ -68,8 +70,18 @@ async def startup_event():
     
     This prevents API Bans and ensures stability.
     """
-    print("✅ API Server Starting...")
-    print("🚀 Initializing Stream Producer (Leader Election Mode)...")
+    logger.info("✅ API Server Starting...")
+    # UvicornWorker runs loop="auto" -> uvloop whenever it is installed (see requirements)
+    logger.info("🔁 Event Loop: %s", type(asyncio.get_running_loop()).__module__)
+    logger.info("🚀 Initializing Stream Producer (Leader Election Mode)...")
     
     # Run the Producer in the background without blocking the API
-    asyncio.create_task(producer.start())
\ No newline at end of file
+    asyncio.create_task(producer.start())
+
+    # Warm the TA kernels on the TA pool (first chart request skips the cold start)
+    asyncio.create_task(technical_service.run_ta(technical_service.warm_up))
+
+@router.on_event("shutdown")
+async def shutdown_event():
+    # Close the shared upstream pool with the worker
+    await http_client.close()
\ No newline at end of file
@@ -1,6 +1,11 @@
-﻿import requests
+﻿import re
+import httpx
+import requests
+import logging
 from bs4 import BeautifulSoup
 
+logger = logging.getLogger("Chartink")
+
 # --- CENTRALIZED SCREENER REGISTRY ---
 SCREENERS = {
     "bullish_reversal": {
@@ -89,7 +94,44 @@ def fetch_screener(screener_key: str):
                 
         return[]
     except Exception as e:
-        print(f"⚠️ Chartink Engine Error [{screener_key}]: {e}")
+        logger.warning("⚠️ Chartink Engine Error [%s]: %s", screener_key, e)
+        return[]
+
+# --- ASYNC TWIN (No worker thread parked on two Chartink round-trips) ---
+# Own short-lived client: the CSRF token is bound to this session's cookies,
+# which must not leak into the shared upstream pool's cookie jar.
+CHARTINK_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36'
+}
+# Only the one meta tag is needed -> regex instead of a full-page soup on the event loop
+CSRF_META_RE = re.compile(r'<meta[^>]*name=["\']csrf-token["\'][^>]*>', re.I)
+CONTENT_ATTR_RE = re.compile(r'content=["\']([^"\']+)["\']', re.I)
+
+async def fetch_screener_async(screener_key: str):
+    config = SCREENERS.get(screener_key)
+    if not config: return[]
+
+    try:
+        async with httpx.AsyncClient(headers=CHARTINK_HEADERS, timeout=10, follow_redirects=True) as s:
+            r = await s.get(config['url'])
+            meta = CSRF_META_RE.search(r.text)
+            token = CONTENT_ATTR_RE.search(meta.group(0)) if meta else None
+            if not token: return[]
+
+            res = await s.post('https://chartink.com/screener/process', data={'scan_clause': config['scan_clause']}, headers={
+                'X-CSRF-TOKEN': token.group(1),
+                'X-Requested-With': 'XMLHttpRequest',
+                'Origin': 'https://chartink.com',
+                'Referer': config['url']
+            })
+
+            if res.status_code == 200:
+                data = res.json().get('data', [])
+                return data[:20] # Top 20 results for UI performance
+
+        return[]
+    except Exception as e:
+        logger.warning("⚠️ Chartink Engine Error [%s]: %s", screener_key, e)
         return[]
 
 def get_all_screener_configs():
@@ -1,10 +1,8 @@
 import os
+import asyncio
 import requests
 from datetime import datetime
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from . import http_client
 
 FMP_API_KEY = os.getenv("FMP_API_KEY")
 BASE_URL = "https://financialmodelingprep.com/api/v3"
@@ -34,25 +32,31 @@ def _fetch(url: str, params: dict = None):
         # Silent fail to keep app running
         return None
 
+async def _fetch_async(url: str, params: dict = None):
+    """
+    Native async twin of _fetch (shared httpx pool, no thread hop).
+    """
+    if not FMP_API_KEY: return None
+    if params is None: params = {}
+    params['apikey'] = FMP_API_KEY
+    return await http_client.get_json(url, params=params, timeout=4)
+
 # ==========================================
 # 1. SEARCH & CORE (Optimized)
 # ==========================================
 
-def search_ticker(query: str, limit: int = 10):
+async def search_ticker_async(query: str, limit: int = 10):
     """
     Primary Search Engine.
     """
-    endpoint = f"{BASE_URL}/search"
-    params = {'query': query, 'limit': limit}
-    res = _fetch(endpoint, params)
+    res = await _fetch_async(f"{BASE_URL}/search", {'query': query, 'limit': limit})
     return res if res else []
 
-def get_company_profile(symbol: str):
+async def get_company_profile_async(symbol: str):
     """
     Backup Profile Data (Description, Website, Sector).
     """
-    endpoint = f"{BASE_URL}/profile/{symbol}"
-    res = _fetch(endpoint)
+    res = await _fetch_async(f"{BASE_URL}/profile/{symbol}")
     return res[0] if res and isinstance(res, list) else {}
 
 # ==========================================
@@ -74,43 +78,36 @@ def get_financial_statements(symbol: str, statement_type: str, period: str = "an
 # 3. ANALYSTS & NEWS (PRIMARY SOURCE)
 # ==========================================
 
-def get_analyst_ratings(symbol: str):
+async def get_analyst_ratings_async(symbol: str):
     """
     Fetches Buy/Sell/Hold ratings.
     """
-    endpoint = f"{BASE_URL}/rating/{symbol}"
-    params = {'limit': 1}
-    res = _fetch(endpoint, params)
+    res = await _fetch_async(f"{BASE_URL}/rating/{symbol}", {'limit': 1})
     return res if res else []
 
-def get_price_target_consensus(symbol: str):
+async def get_price_target_consensus_async(symbol: str):
     """
     Fetches High/Low/Avg Price Targets.
     """
-    endpoint = f"{BASE_URL}/price-target-consensus/{symbol}"
-    res = _fetch(endpoint)
+    res = await _fetch_async(f"{BASE_URL}/price-target-consensus/{symbol}")
     return res[0] if res and isinstance(res, list) else {}
 
-def get_shareholding_data(symbol: str):
+async def get_shareholding_data_async(symbol: str):
     """
     Fetches Institutional Holders.
     """
-    endpoint = f"{BASE_URL}/institutional-holder/{symbol}"
-    res = _fetch(endpoint)
+    res = await _fetch_async(f"{BASE_URL}/institutional-holder/{symbol}")
     return res if res else []
 
 # ==========================================
 # 4. PEERS & METRICS (V4 UPGRADE)
 # ==========================================
 
-def get_stock_peers(symbol: str):
+async def get_stock_peers_async(symbol: str):
     """
     Uses FMP V4 endpoint for better peer matching.
     """
-    endpoint = f"{BASE_URL_V4}/stock_peers"
-    params = {'symbol': symbol}
-    res = _fetch(endpoint, params)
-    # V4 returns: [{"symbol": "AAPL", "peersList": [...]}]
+    res = await _fetch_async(f"{BASE_URL_V4}/stock_peers", {'symbol': symbol})
     if res and isinstance(res, list) and len(res) > 0 and 'peersList' in res[0]:
         return res[0]['peersList']
     return []
@@ -154,11 +151,8 @@ def process_fmp_candles(raw_list: list):
         if not date_str: continue
         
         try:
-            # Parse Date
-            if ":" in date_str:
-                dt = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-            else:
-                dt = datetime.strptime(date_str, "%Y-%m-%d")
+            # Parse Date ("YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS"; C fast path, no strptime)
+            dt = datetime.fromisoformat(date_str)
             
             ts = int(dt.timestamp())
             
@@ -180,12 +174,7 @@ def process_fmp_candles(raw_list: list):
     data.sort(key=lambda x: x['time'])
     return data
 
-def get_commodity_history(symbol: str, range_type: str = "1d"):
-    """
-    Fetches Commodity History from FMP (XAUUSD, CLUSD).
-    """
-    if not FMP_API_KEY: return []
-    
+def _commodity_history_url(symbol: str, range_type: str):
     # Map Range to FMP Interval
     interval = "5min"
     if range_type in ["1H", "4H"]: interval = "1hour"
@@ -198,25 +187,9 @@ def get_commodity_history(symbol: str, range_type: str = "1d"):
     # If Daily History, FMP uses a different endpoint structure
     if range_type in ["1W", "1M", "1D"] and interval == "5min":
         url = f"{BASE_URL}/historical-price-full/{symbol}?apikey={FMP_API_KEY}"
+    return url
 
-    res = _fetch(url)
-    
-    # Normalize Response: Daily returns { symbol:..., historical: [...] }
-    raw_data = []
-    if isinstance(res, dict) and 'historical' in res:
-        raw_data = res['historical']
-    elif isinstance(res, list):
-        raw_data = res
-    
-    # Send to the Slicer for speed
-    return process_fmp_candles(raw_data)
-
-def get_crypto_history(symbol: str, range_type: str = "1D"):
-    """
-    Fetches Crypto Candles (BTCUSD).
-    """
-    if not FMP_API_KEY: return []
-    
+def _crypto_history_url(symbol: str, range_type: str):
     # Intraday Logic
     interval = "5min"
     is_intraday = range_type in ["5M", "15M", "1H", "4H"]
@@ -226,35 +199,57 @@ def get_crypto_history(symbol: str, range_type: str = "1D"):
     if range_type == "4H": interval = "4hour"
     
     if is_intraday:
-        url = f"{BASE_URL}/historical-chart/{interval}/{symbol}?apikey={FMP_API_KEY}"
-    else:
-        # Daily/Weekly
-        url = f"{BASE_URL}/historical-price-full/{symbol}?apikey={FMP_API_KEY}"
+        return f"{BASE_URL}/historical-chart/{interval}/{symbol}?apikey={FMP_API_KEY}"
+    # Daily/Weekly
+    return f"{BASE_URL}/historical-price-full/{symbol}?apikey={FMP_API_KEY}"
 
-    res = _fetch(url)
-    
+def _history_candles(res):
+    # Normalize Response: Daily returns { symbol:..., historical: [...] }
     raw_data = []
     if isinstance(res, dict) and 'historical' in res:
         raw_data = res['historical']
     elif isinstance(res, list):
         raw_data = res
     
-    # Use the Slicer
+    # Send to the Slicer for speed
     return process_fmp_candles(raw_data)
+
+async def get_commodity_history_async(symbol: str, range_type: str = "1d"):
+    """
+    Fetches Commodity History from FMP (XAUUSD, CLUSD).
+    """
+    if not FMP_API_KEY: return []
+    return _history_candles(await _fetch_async(_commodity_history_url(symbol, range_type)))
+
+async def get_crypto_history_async(symbol: str, range_type: str = "1D"):
+    """
+    Fetches Crypto Candles (BTCUSD).
+    """
+    if not FMP_API_KEY: return []
+    return _history_candles(await _fetch_async(_crypto_history_url(symbol, range_type)))
+
+async def get_market_history_async(symbol: str, range_type: str = "1D"):
+    """
+    Commodity -> Crypto fallback with both requests in flight at once (1 RTT, not 2).
+    Commodity data always wins; the crypto request is cancelled when it isn't needed.
+    """
+    if not FMP_API_KEY: return []
+    crypto_task = asyncio.create_task(get_crypto_history_async(symbol, range_type))
+    try:
+        chart_list = await get_commodity_history_async(symbol, range_type)
+    except BaseException:
+        crypto_task.cancel()
+        raise
+    if chart_list:
+        crypto_task.cancel()
+        return chart_list
+    return await crypto_task
+
 # ==========================================
 # 6. REAL-TIME QUOTES (HIGH SPEED)
 # ==========================================
 
-def get_quote(symbol: str):
-    """
-    Fetches Live Price for Commodities/Stocks from FMP.
-    Structure matches EODHD quote for seamless frontend integration.
-    """
-    if not FMP_API_KEY: return {}
-    
-    endpoint = f"{BASE_URL}/quote/{symbol}"
-    res = _fetch(endpoint)
-    
+def _parse_quote(res):
     if res and isinstance(res, list) and len(res) > 0:
         data = res[0]
         return {
@@ -272,17 +267,37 @@ def get_quote(symbol: str):
         }
     return {}
 
-def get_crypto_real_time_bulk(symbols: list):
+async def get_quote_async(symbol: str):
     """
-    Fetches Live Prices for multiple Cryptos in 1 call.
-    Used for the Stream Engine.
+    Fetches Live Price for Commodities/Stocks from FMP.
+    Structure matches EODHD quote for seamless frontend integration.
     """
-    if not FMP_API_KEY or not symbols: return []
-    
+    if not FMP_API_KEY: return {}
+    return _parse_quote(await _fetch_async(f"{BASE_URL}/quote/{symbol}"))
+
+def _bulk_quote_url(symbols: list):
     # FMP format: BTCUSD,ETHUSD
     # Ensure symbols are clean (remove .CC or -USD if passed)
     clean_syms = [s.replace("-USD.CC", "USD").replace("-", "").replace(".CC", "") for s in symbols]
-    query = ",".join(clean_syms)
-    
-    endpoint = f"{BASE_URL}/quote/{query}"
-    return _fetch(endpoint) or []
\ No newline at end of file
+    return f"{BASE_URL}/quote/{','.join(clean_syms)}"
+
+async def get_crypto_real_time_bulk_async(symbols: list):
+    """
+    Fetches Live Prices for multiple Cryptos in 1 call.
+    Used for the Stream Engine.
+    """
+    if not FMP_API_KEY or not symbols: return []
+    return await _fetch_async(_bulk_quote_url(symbols)) or []
+
+# Max tickers per comma-separated /quote URL
+QUOTE_BATCH_SIZE = 100
+
+async def get_quotes_batch_async(symbols: list):
+    """
+    Raw FMP quotes for many stock tickers in one /quote/A,B,C call (per 100 symbols).
+    Returns {symbol: quote}. Tickers go out as-is (BRK-B, RELIANCE.NS), no crypto cleanup.
+    """
+    if not FMP_API_KEY or not symbols: return {}
+    chunks = [symbols[i:i + QUOTE_BATCH_SIZE] for i in range(0, len(symbols), QUOTE_BATCH_SIZE)]
+    results = await asyncio.gather(*[_fetch_async(f"{BASE_URL}/quote/{','.join(chunk)}") for chunk in chunks])
+    return {q['symbol']: q for res in results if isinstance(res, list) for q in res if isinstance(q, dict) and q.get('symbol')}
\ No newline at end of file
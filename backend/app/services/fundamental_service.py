@@ -1,4 +1,7 @@
 import pandas as pd
+import logging
+
+logger = logging.getLogger("Fundamentals")
 
 def calculate_piotroski_f_score(income_statements, balance_sheets, cash_flow_statements):
     """
@@ -125,7 +128,7 @@ def calculate_piotroski_f_score(income_statements, balance_sheets, cash_flow_sta
             criteria_met.append("Improving Asset Turnover efficiency")
 
     except Exception as e:
-        print(f"Piotroski Calculation Error: {e}")
+        logger.warning("Piotroski Calculation Error: %s", e)
         return {"score": score, "criteria": criteria_met + ["Calculation Error"]}
 
     return {"score": score, "criteria": criteria_met}
@@ -233,7 +236,7 @@ def calculate_graham_scan(profile: dict, key_metrics: dict, income_statements: l
             score += 1
 
     except Exception as e:
-        print(f"Graham Scan Error: {e}")
+        logger.warning("Graham Scan Error: %s", e)
         criteria_met.append("Analysis interrupted by missing data")
 
     return {"score": score, "criteria": criteria_met}
\ No newline at end of file
@@ -1,9 +1,10 @@
 ﻿import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+import logging
+import hashlib
+import orjson
+from functools import wraps
 import itertools
-
-load_dotenv()
+from . import redis_service
 
 # --- ROBUST KEY ROTATION ---
 try:
@@ -19,82 +20,213 @@ except:
     GEMINI_API_KEYS =[]
     key_cycler = None
 
+# --- LAZY SDK LOADING ---
+# google.generativeai is the heaviest import in the app (~0.6s). It is only
+# needed once an AI call happens, so we keep it off the boot / health-check path.
+genai = None
+
+def load_genai():
+    global genai
+    if genai is None:
+        import google.generativeai as sdk
+        genai = sdk
+    return genai
+
+# genai.configure() drops the SDK's cached clients (new channel + TLS handshake on
+# the next call). Only reconfigure when rotation actually lands on a different key.
+active_api_key = None
+
 def configure_gemini_for_request():
+    global active_api_key
+    load_genai()
     if key_cycler:
-        try: genai.configure(api_key=next(key_cycler))
+        try:
+            api_key = next(key_cycler)
+            if api_key != active_api_key:
+                genai.configure(api_key=api_key)
+                active_api_key = api_key
         except: pass
 
 # *** DYNAMIC MODEL SELECTOR ***
 MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")
-print(f"🤖 AI Engine Initialized with Model: {MODEL_NAME}")
+logger = logging.getLogger("Gemini")
+logger.info("🤖 AI Engine Initialized with Model: %s", MODEL_NAME)
 
 # --- VISION AI (Chart Identification) ---
 from .system_watchdog import auto_heal
 
+# --- LLM RESPONSE CACHE (Redis, keyed by content hash) ---
+# Same inputs -> same answer for hours: a repeat call from any worker is one Redis GET
+# instead of a 2-10s Gemini round-trip. Images enter the key as their SHA-256.
+LLM_CACHE_TTL = 86400
+TICKER_CACHE_TTL = 30 * 86400  # name -> ticker mappings barely change
+
+def llm_cache_key(fn_name: str, args: tuple, kwargs: dict):
+    blob = orjson.dumps(
+        {"fn": fn_name, "args": args, "kwargs": kwargs},
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+        default=lambda o: hashlib.sha256(o).hexdigest() if isinstance(o, bytes) else str(o)
+    )
+    return "llm:" + hashlib.sha256(blob).hexdigest()
+
+def llm_cache(ttl: int = LLM_CACHE_TTL, skip=lambda result: False):
+    """For async Gemini calls. Error / fallback results (skip() -> True) are never stored."""
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            key = llm_cache_key(fn.__name__, args, kwargs)
+            cached = await redis_service.redis_client.get_cache(key)
+            if cached is not None: return cached
+            result = await fn(*args, **kwargs)
+            if result and not skip(result):
+                await redis_service.redis_client.set_cache(key, result, ttl)
+            return result
+        return wrapper
+    return decorator
+
+# --- IMAGE SNIFFER (Trust bytes, not the client's MIME header) ---
+IMAGE_MAGIC_MIMES = ((b"\x89PNG", "image/png"), (b"\xff\xd8\xff", "image/jpeg"), (b"GIF8", "image/gif"))
+
+def sniff_image_mime(data: bytes):
+    """Real MIME type from the first bytes, or None if it isn't a supported image."""
+    for magic, mime in IMAGE_MAGIC_MIMES:
+        if data.startswith(magic): return mime
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP": return "image/webp"
+    return None
+
+# --- VISION PAYLOAD PREP (Once per upload) ---
+# 4K PNG screenshots are several MB; Gemini downsamples anything past ~1568px
+# anyway. Shrink + re-encode as JPEG once so every vision call uploads the small buffer.
+VISION_MAX_SIDE = 1568
+VISION_JPEG_QUALITY = 85
+
+def prepare_vision_image(image_bytes: bytes):
+    """Returns the compact JPEG, the original bytes (no Pillow), or None if the image is corrupt."""
+    try:
+        import io
+        from PIL import Image
+    except ImportError:
+        return image_bytes
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            img.thumbnail((VISION_MAX_SIDE, VISION_MAX_SIDE))
+            out = io.BytesIO()
+            img.convert("RGB").save(out, format="JPEG", quality=VISION_JPEG_QUALITY, optimize=True)
+        compact = out.getvalue()
+        return compact if len(compact) < len(image_bytes) else image_bytes
+    except Exception:
+        return None  # Truncated / malformed -> reject before paying a Gemini round-trip
+
+CONTEXT_PROMPT = (
+    "You are a highly precise OCR bot. Read the stock chart image.\n"
+    "Identify the Ticker Symbol and the Timeframe.\n"
+    "Format your response EXACTLY as: SYMBOL,TIMEFRAME\n"
+    "Example 1: RELIANCE,15M\n"
+    "Example 2: NIFTY,1D\n"
+    "Example 3: BTC,4H\n"
+    "Example 4: HDFCBANK,1D\n"
+    "If you cannot determine the timeframe, default to 1D. Return NOTHING else."
+)
+PURE_PROMPT = (
+    "Act as a Quant Analyst. Analyze this chart based purely on geometry. Output VERDICT, MARKET STRUCTURE, GEOMETRIC SIGNALS, and TRADE SETUP.\n"
+    "Before the analysis, write ONE first line EXACTLY as: CONTEXT: SYMBOL,TIMEFRAME (e.g. CONTEXT: RELIANCE,15M).\n"
+    "Use NOT_FOUND if no ticker is visible and 1D if the timeframe is not visible."
+)
+
+def vision_part(image_bytes: bytes):
+    return {"mime_type": sniff_image_mime(image_bytes) or "image/jpeg", "data": image_bytes}
+
+def parse_context_reply(text: str):
+    return text.strip().upper().replace("\n", "").replace(" ", "")
+
+def split_context_analysis(text: str):
+    """'CONTEXT: SYMBOL,TIMEFRAME' first line + analysis -> (context, analysis)."""
+    text = text.strip()
+    first, _, rest = text.partition("\n")
+    first = first.replace("*", "").strip()
+    if first.upper().startswith("CONTEXT:"):
+        context = first[8:].upper().replace(" ", "")
+        return context or "NOT_FOUND,1D", rest.strip()
+    return "NOT_FOUND,1D", text
+
+# The SDK's grpc.aio call runs on the event loop, so a slow
+# Gemini round-trip holds no worker thread (to_thread is capped at ~40 per process).
 @auto_heal(fallback_return="NOT_FOUND,1D")
-def identify_chart_context_from_image(image_bytes: bytes):
+@llm_cache(skip=lambda context: "NOT_FOUND" in context)
+async def identify_chart_context_from_image_async(image_bytes: bytes):
     configure_gemini_for_request()
     model = genai.GenerativeModel(MODEL_NAME)
-    
-    prompt = (
-        "You are a highly precise OCR bot. Read the stock chart image.\n"
-        "Identify the Ticker Symbol and the Timeframe.\n"
-        "Format your response EXACTLY as: SYMBOL,TIMEFRAME\n"
-        "Example 1: RELIANCE,15M\n"
-        "Example 2: NIFTY,1D\n"
-        "Example 3: BTC,4H\n"
-        "Example 4: HDFCBANK,1D\n"
-        "If you cannot determine the timeframe, default to 1D. Return NOTHING else."
-    )
-    
-    response = model.generate_content([prompt, {"mime_type": "image/jpeg", "data": image_bytes}])
-    return response.text.strip().upper().replace("\n", "").replace(" ", "")
+    response = await model.generate_content_async([CONTEXT_PROMPT, vision_part(image_bytes)])
+    return parse_context_reply(response.text)
 
-def analyze_pure_vision(image_bytes: bytes):
+@llm_cache(skip=lambda result: result[1].startswith("**VERDICT:** ERROR"))
+async def identify_and_analyze_async(image_bytes: bytes):
+    """
+    ONE multimodal call -> ("SYMBOL,TIMEFRAME", pure geometry analysis).
+    The context line uses the same format as identify_chart_context_from_image_async,
+    so the caller can reuse it instead of sending the same image a second time.
+    """
     try:
         configure_gemini_for_request()
         model = genai.GenerativeModel(MODEL_NAME)
-        prompt = "Act as a Quant Analyst. Analyze this chart based purely on geometry. Output VERDICT, MARKET STRUCTURE, GEOMETRIC SIGNALS, and TRADE SETUP."
-        response = model.generate_content([prompt, {"mime_type": "image/jpeg", "data": image_bytes}])
-        return response.text.strip()
+        response = await model.generate_content_async([PURE_PROMPT, vision_part(image_bytes)])
+        return split_context_analysis(response.text)
     except Exception as e:
-        print(f"❌ PURE VISION ERROR: {e}")
-        return f"**VERDICT:** ERROR\n**ANALYSIS:** {str(e)}"
+        logger.error("❌ PURE VISION ERROR: %s", e)
+        return "NOT_FOUND,1D", f"**VERDICT:** ERROR\n**ANALYSIS:** {str(e)}"
 
 # --- TEXT GENERATION ---
-def get_ticker_from_query(query: str):
+# Every call goes through generate_content_async: the routers await them
+# directly, so a slow Gemini answer never parks a worker thread.
+def ticker_prompt(query: str):
+    return f"Identify stock ticker for: {query}. Return ONLY the ticker (e.g. RELIANCE.NS)."
+
+def forecast_prompt(company_name: str, price_target: dict, currency: str):
+    return f"Write a 2-paragraph forecast summary for {company_name} using this data: Targets: {price_target}, Currency: {currency}."
+
+def peers_prompt(company_name: str, industry: str, country: str):
+    return (
+        f"Identify 5 direct publicly traded competitor stock tickers for '{company_name}' "
+        f"operating in the '{industry}' industry within '{country}'. "
+        "If it is a mega-cap conglomerate, list its true market-cap peers. "
+        "Return ONLY a comma-separated list of symbols. Do not write any other text. "
+        "For Indian stocks, ensure they end with .NS. Example: TCS.NS,INFY.NS,HCLTECH.NS"
+    )
+
+# NOT_FOUND stays uncached too: /search pins misses for SEARCH_MISS_TTL (minutes), not a month
+@llm_cache(ttl=TICKER_CACHE_TTL, skip=lambda ticker: ticker in ("ERROR", "NOT_FOUND"))
+async def get_ticker_from_query_async(query: str):
     try:
         configure_gemini_for_request()
         model = genai.GenerativeModel(MODEL_NAME)
-        response = model.generate_content(f"Identify stock ticker for: {query}. Return ONLY the ticker (e.g. RELIANCE.NS).")
-        return response.text.strip().replace("", "").upper()
+        response = await model.generate_content_async(ticker_prompt(query))
+        return response.text.strip().upper()
     except Exception as e:
-        print(f"❌ SEARCH ERROR: {e}")
+        logger.error("❌ SEARCH ERROR: %s", e)
         return "ERROR"
 
-def generate_forecast_analysis(company_name: str, analyst_ratings: list, price_target: dict, key_stats: dict, news_headlines: list, currency: str = "USD"):
+async def generate_forecast_analysis_async(company_name: str, analyst_ratings: list, price_target: dict, key_stats: dict, news_headlines: list, currency: str = "USD"):
+    # Cache on the prompt inputs only: key_stats carries live day ranges and the
+    # headlines arrive later, so hashing them would miss on nearly every call
+    return await forecast_from_targets_async(company_name, price_target, currency)
+
+@llm_cache(skip=lambda text: text == "Forecast analysis temporarily unavailable.")
+async def forecast_from_targets_async(company_name: str, price_target: dict, currency: str):
     try:
         configure_gemini_for_request()
         model = genai.GenerativeModel(MODEL_NAME)
-        prompt = f"Write a 2-paragraph forecast summary for {company_name} using this data: Targets: {price_target}, Currency: {currency}."
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(forecast_prompt(company_name, price_target, currency))
         return response.text.strip()
     except Exception as e:
-        print(f"❌ FORECAST ERROR: {e}")
+        logger.error("❌ FORECAST ERROR: %s", e)
         return "Forecast analysis temporarily unavailable."
 
 @auto_heal(fallback_return="")
-def find_peer_tickers_by_industry(company_name: str, sector: str, industry: str, country: str):
+@llm_cache()
+async def find_peer_tickers_by_industry_async(company_name: str, sector: str, industry: str, country: str):
     configure_gemini_for_request()
     model = genai.GenerativeModel(MODEL_NAME)
-    prompt = (
-        f"Identify 5 direct publicly traded competitor stock tickers for '{company_name}' "
-        f"operating in the '{industry}' industry within '{country}'. "
-        "If it is a mega-cap conglomerate, list its true market-cap peers. "
-        "Return ONLY a comma-separated list of symbols. Do not write any other text. "
-        "For Indian stocks, ensure they end with .NS. Example: TCS.NS,INFY.NS,HCLTECH.NS"
-    )
-    response = model.generate_content(prompt)
+    response = await model.generate_content_async(peers_prompt(company_name, industry, country))
     return response.text.strip().replace(" ", "").replace("\n", "")
 
 # --- LEGACY PLACEHOLDERS (Handled by Math Engine now) ---
@@ -134,7 +266,7 @@ def analyze_chart_technicals_from_image(image_bytes: bytes):
     CONFIDENCE: [High / Medium / Low]
     RATIONALE: [One clear sentence explaining the strategy.]'''
     
-    response = model.generate_content([prompt, {"mime_type": "image/jpeg", "data": image_bytes}])
+    response = model.generate_content([prompt, vision_part(image_bytes)])
     return response.text.strip()
 
 
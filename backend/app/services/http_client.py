@@ -0,0 +1,53 @@
+import httpx
+
+# ==========================================
+# SHARED ASYNC HTTP CLIENT (One pool per worker)
+# ==========================================
+# Native async calls skip the asyncio.to_thread hop entirely and keep
+# TCP/TLS connections alive across requests (no handshake per call).
+# Connect is capped separately: an unreachable host fails in 2s instead of eating
+# the whole read budget (which stays per-call, e.g. 4s quotes / 10s history).
+# Keep-alive slots cover a full /all + /peers burst, so idle sockets are reused, not re-handshaked.
+CONNECT_TIMEOUT = 2.0
+
+# HTTP/2 (httpx[http2] -> h2): the concurrent FMP/EODHD calls of one request
+# multiplex over a single connection per host. Plain keep-alive HTTP/1.1 otherwise.
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+client = httpx.AsyncClient(
+    http2=HTTP2,
+    timeout=httpx.Timeout(10.0, connect=CONNECT_TIMEOUT),
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+)
+
+async def get_json(url: str, params: dict = None, timeout: float = 10.0):
+    """
+    GET -> parsed JSON. Returns None on non-200 or any network error
+    (same silent-fail contract as the requests-based helpers).
+    """
+    try:
+        response = await client.get(url, params=params, timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT))
+        if response.status_code == 200:
+            return response.json()
+        return None
+    except Exception:
+        return None
+
+async def post_json(url: str, json: dict = None, headers: dict = None, timeout: float = 10.0):
+    """
+    POST a JSON body -> parsed JSON response body, whatever the status (login APIs
+    answer errors and redirects in JSON too). None on network error / non-JSON body.
+    """
+    try:
+        response = await client.post(url, json=json, headers=headers, timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT))
+        return response.json()
+    except Exception:
+        return None
+
+async def close():
+    """Drains the pool on worker shutdown (no half-open sockets left to the upstreams)."""
+    await client.aclose()
@@ -1,8 +1,8 @@
 import os
+import logging
 import requests
-from dotenv import load_dotenv
 
-load_dotenv()
+logger = logging.getLogger("IndianData")
 
 # 1. Get the key
 INDIAN_API_KEY = os.getenv("INDIAN_API_KEY")
@@ -46,5 +46,5 @@ def get_indian_shareholding(symbol: str):
         }
 
     except Exception as e:
-        print(f"Error fetching Indian shareholding for {symbol}: {e}")
+        logger.warning("Error fetching Indian shareholding for %s: %s", symbol, e)
         return None
\ No newline at end of file
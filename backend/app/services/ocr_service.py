@@ -3,6 +3,9 @@ from PIL import Image
 import io
 import re
 import os
+import logging
+
+logger = logging.getLogger("OCR")
 
 # Point to the Windows installation of Tesseract
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR	esseract.exe"
@@ -24,5 +27,5 @@ def extract_ticker_fast(image_bytes):
             return matches[0]
         return "NOT_FOUND"
     except Exception as e:
-        print(f"OCR Error: {e}")
+        logger.warning("OCR Error: %s", e)
         return "NOT_FOUND"
@@ -1,14 +1,28 @@
 import os
-import json
+import orjson
+import logging
 import asyncio
+import random
+import secrets
 import time
 import redis.asyncio as redis
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
 
 REDIS_URL = os.getenv("REDIS_URL")
+logger = logging.getLogger("Redis")
+
+# Atomic compare-and-delete: release a lock only if it still holds our token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# --- TTL JITTER ---
+# Keys warmed together (boot, flush, a traffic burst) would otherwise all expire in
+# the same second and rebuild together every TTL. +0-25% spreads the expiries out.
+def jittered_ttl(base_ttl: int) -> int:
+    return base_ttl + random.randint(0, base_ttl // 4)
 
 # ==========================================
 # 1. IN-MEMORY ENGINE (Zero-Latency Localhost)
@@ -46,23 +60,29 @@ class MemoryPubSub:
                 pass
 
     # --- LOCAL LOCKING SIMULATION ---
-    async def acquire_lock(self, key, ttl):
+    async def acquire_lock(self, key, ttl, token="LOCKED"):
         """Simulates Redis SET NX EX"""
         now = time.time()
         # If lock exists and hasn't expired, return False
-        if key in self.locks and now < self.locks[key]:
+        if key in self.locks and now < self.locks[key][0]:
             return False
         
-        # Take lock
-        self.locks[key] = now + ttl
+        # Take lock (expiry, owner token)
+        self.locks[key] = (now + ttl, token)
         return True
 
+    async def release_lock(self, key, token=None):
+        """Simulates Redis DEL (compare-and-delete when a token is given)"""
+        if token is not None and self.locks.get(key, (0, None))[1] != token:
+            return
+        self.locks.pop(key, None)
+
     async def extend_lock(self, key, ttl):
         """Simulates Redis EXPIRE"""
         now = time.time()
         # Only extend if we actually have it (simplified for local)
         if key in self.locks:
-            self.locks[key] = now + ttl
+            self.locks[key] = (now + ttl, self.locks[key][1])
             return True
         return False
 
@@ -74,6 +94,16 @@ local_storage = {
     "heartbeats": {}
 }
 
+# --- CACHE CODEC (orjson both ways: 3-6x faster than stdlib json on big payloads) ---
+# NaN/Inf are written as null (valid JSON). Legacy entries stdlib json wrote with a
+# bare NaN don't parse -> treated as a miss and rebuilt, never a 500.
+CACHE_DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def _loads(data):
+    if not data: return None
+    try: return orjson.loads(data)
+    except orjson.JSONDecodeError: return None
+
 # ==========================================
 # 2. ROBUST REDIS MANAGER (With Locking)
 # ==========================================
@@ -89,15 +119,15 @@ class RedisManager:
             return self.redis if self.use_redis else None
 
         # DEBUG LOGGING
-        print(f"🔍 DEBUG: Checking Redis Connection...")
-        print(f"   -> REDIS_URL exists? {'YES' if REDIS_URL else 'NO'}")
+        logger.debug("🔍 Checking Redis Connection...")
+        logger.debug("   -> REDIS_URL exists? %s", "YES" if REDIS_URL else "NO")
         if REDIS_URL:
             # Mask password for logs
             masked = REDIS_URL.split('@')[-1] if '@' in REDIS_URL else 'HIDDEN'
-            print(f"   -> Target: {masked}")
+            logger.debug("   -> Target: %s", masked)
 
         if not REDIS_URL:
-            print("⚡ Redis: No URL found. Using Local Memory.")
+            logger.info("⚡ Redis: No URL found. Using Local Memory.")
             self.use_redis = False
             self._checked = True
             return None
@@ -108,29 +138,30 @@ class RedisManager:
             r = redis.Redis(connection_pool=pool)
             await r.ping()
             
-            print("✅ Redis: CONNECTED SUCCESSFULLY!")
+            logger.info("✅ Redis: CONNECTED SUCCESSFULLY!")
             self.redis = r
             self.use_redis = True
         except Exception as e:
-            print(f"❌ Redis Connection FAILED: {e}")
-            print("   -> Switching to Local Memory Mode.")
+            logger.warning("❌ Redis Connection FAILED: %s", e)
+            logger.warning("   -> Switching to Local Memory Mode.")
             self.use_redis = False
         
         self._checked = True
         return self.redis if self.use_redis else None
 
     # --- DISTRIBUTED LOCKING (CRITICAL FOR FYERS) ---
-    async def acquire_lock(self, key: str, ttl: int = 15):
+    async def acquire_lock(self, key: str, ttl: int = 15, token: str = "LOCKED"):
         """
         Tries to become the 'Master' worker.
         Returns True if lock acquired, False if someone else has it.
+        Pass a unique token to make release_lock ownership-checked.
         """
         r = await self._get_connection()
         if r:
             # Redis 'SET ... NX' (Only set if Not Exists)
-            return await r.set(key, "LOCKED", nx=True, ex=ttl)
+            return await r.set(key, token, nx=True, ex=ttl)
         else:
-            return await memory_bus.acquire_lock(key, ttl)
+            return await memory_bus.acquire_lock(key, ttl, token)
 
     async def extend_lock(self, key: str, ttl: int = 15):
         """
@@ -142,6 +173,20 @@ class RedisManager:
         else:
             return await memory_bus.extend_lock(key, ttl)
 
+    async def release_lock(self, key: str, token: str = None):
+        """
+        Drops the lock. With a token, only if we still own it: once the TTL has
+        lapsed another worker may hold the key, and a blind DEL would free theirs.
+        """
+        r = await self._get_connection()
+        if r:
+            try:
+                if token is None: await r.delete(key)
+                else: await r.eval(RELEASE_LOCK_SCRIPT, 1, key, token)
+            except Exception: pass
+        else:
+            await memory_bus.release_lock(key, token)
+
     # --- WATCHLIST LOGIC ---
     async def add_active_symbol(self, symbol: str):
         r = await self._get_connection()
@@ -149,7 +194,7 @@ class RedisManager:
             try:
                 await r.sadd("active_symbols_v2", symbol)
                 await r.setex(f"heartbeat:{symbol}", 15, "alive")
-            except: pass
+            except Exception: pass
         else:
             # Local Mode
             local_storage["active"].add(symbol)
@@ -165,7 +210,7 @@ class RedisManager:
                     if await r.exists(f"heartbeat:{sym}"): active.append(sym)
                     else: await r.srem("active_symbols_v2", sym)
                 return active
-            except: return []
+            except Exception: return []
         else:
             # Local Mode: Check heartbeats
             now = time.time()
@@ -180,13 +225,14 @@ class RedisManager:
     # --- PUB/SUB LOGIC ---
     async def publish_update(self, symbol: str, data: dict):
         try:
-            msg = json.dumps({"symbol": symbol, "data": data}, default=str)
+            # orjson: strict JSON (NaN -> null) so the consumer can decode with orjson too
+            msg = orjson.dumps({"symbol": symbol, "data": data}, default=str).decode()
             r = await self._get_connection()
             if r:
                 await r.publish("market_feed", msg)
             else:
                 await memory_bus.publish(msg)
-        except: pass
+        except Exception: pass
 
     def get_subscriber(self):
         # Note: This is synchronous, so we check the flag directly
@@ -199,20 +245,95 @@ class RedisManager:
         r = await self._get_connection()
         if r:
             try:
-                data = await r.get(key)
-                return json.loads(data) if data else None
-            except: return None
-        # Local Mode: Simple Dict Get
-        return local_storage["cache"].get(key)
+                return _loads(await r.get(key))
+            except Exception: return None
+        # Local Mode: Simple Dict Get (raw entries hold serialized JSON)
+        data = local_storage["cache"].get(key)
+        return orjson.loads(data) if isinstance(data, bytes) else data
+
+    async def get_many(self, keys: list):
+        """MGET: several keys in ONE round-trip (None for each miss)."""
+        r = await self._get_connection()
+        if r:
+            try: return [_loads(v) for v in await r.mget(keys)]
+            except Exception: return [None] * len(keys)
+        cache = local_storage["cache"]
+        return [orjson.loads(v) if isinstance(v, bytes) else v for v in (cache.get(k) for k in keys)]
 
     async def set_cache(self, key: str, data: any, ttl: int = 60):
         r = await self._get_connection()
         if r:
-            try: await r.set(key, json.dumps(data, default=str), ex=ttl)
-            except: pass
+            try: await r.set(key, orjson.dumps(data, default=str, option=CACHE_DUMPS_OPTIONS), ex=ttl)
+            except Exception: pass
         else:
             # Local Mode: Simple Dict Set (No TTL for simplicity in dev)
             local_storage["cache"][key] = data
 
+    async def set_cache_jittered(self, key: str, data: any, base_ttl: int = 60):
+        """set_cache with a TTL of base_ttl + 0-25% (see jittered_ttl)."""
+        await self.set_cache(key, data, jittered_ttl(base_ttl))
+
+    # --- RAW JSON CACHE (Serialize once, serve the stored text as-is) ---
+    # Big payloads (/all, index details) skip json.loads + re-encode on every hit.
+    # Same stored format as set_cache, so get_cache readers of these keys still work.
+    # Always returns bytes (or None): the pool decodes to str, local storage holds bytes.
+    async def get_cache_raw(self, key: str):
+        r = await self._get_connection()
+        if r:
+            try: data = await r.get(key)
+            except Exception: return None
+            return data.encode() if isinstance(data, str) else data
+        data = local_storage["cache"].get(key)
+        if data is None or isinstance(data, bytes): return data
+        return orjson.dumps(data, default=str)
+
+    async def set_cache_raw(self, key: str, payload: bytes, ttl: int = 60):
+        r = await self._get_connection()
+        if r:
+            try: await r.set(key, payload, ex=ttl)
+            except Exception: pass
+        else:
+            local_storage["cache"][key] = payload
+
 # Singleton Export
-redis_client = RedisManager()
\ No newline at end of file
+redis_client = RedisManager()
+
+# ==========================================
+# 3. SINGLE-FLIGHT (Per-Worker Request Coalescing)
+# ==========================================
+# On a cache miss every concurrent request for the same key used to rebuild it
+# (N upstream calls per expiry). Now the first caller builds, the rest await it.
+INFLIGHT = {}
+
+async def singleflight(key: str, factory):
+    """Runs factory() once per key at a time; concurrent callers share the result."""
+    task = INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        INFLIGHT[key] = task
+        task.add_done_callback(lambda done: INFLIGHT.pop(key, None) if INFLIGHT.get(key) is done else None)
+    # Shielded: one client disconnecting doesn't cancel the build the others wait on
+    return await asyncio.shield(task)
+
+# --- CROSS-WORKER COALESCING (Raw-cached payloads) ---
+# singleflight only merges callers inside one worker. With 4 workers a cold key is
+# still built up to 4 times, so the builder also takes a short Redis lock (SET NX EX)
+# and the other workers poll the raw cache key for its result instead.
+BUILD_LOCK_TTL = 10
+BUILD_POLL_INTERVAL = 0.1
+BUILD_POLL_STEPS = 40  # 4s max wait, then build locally (builder died / hung)
+
+async def coalesced_build(key: str, factory):
+    """singleflight(key, factory) across workers; factory() must write the raw cache at `key`."""
+    async def build():
+        lock_key = f"build_lock:{key}"
+        token = secrets.token_hex(8)
+        if await redis_client.acquire_lock(lock_key, BUILD_LOCK_TTL, token):
+            try: return await factory()
+            finally: await redis_client.release_lock(lock_key, token)
+        for _ in range(BUILD_POLL_STEPS):
+            await asyncio.sleep(BUILD_POLL_INTERVAL)
+            cached = await redis_client.get_cache_raw(key)
+            if cached: return cached
+        return await factory()
+    return await singleflight(key, build)
@@ -1,10 +1,9 @@
 ﻿import asyncio
-import json
+import orjson
 import os
 import logging
 from typing import List, Dict
 from fastapi import WebSocket
-import yfinance as yf 
 from ..services import eodhd_service, fmp_service
 from ..services.redis_service import redis_client
 
@@ -16,6 +15,26 @@ FYERS_MAP = {}
 FMP_ASSETS =["BTC-USD.CC", "ETH-USD.CC", "SOL-USD.CC", "XRP-USD.CC", "DOGE-USD.CC", "ADA-USD.CC", "MATIC-USD.CC", "DOT-USD.CC", "LTC-USD.CC", "BNB-USD.CC"]
 YAHOO_MAP = {"CL=F": "USO.US", "GC=F": "XAU-USD.CC", "SI=F": "XAG-USD.CC", "NG=F": "UNG.US", "HG=F": "HGUSD", "BZ=F": "UKOIL"}
 
+# Lookup tables built once (the pollers and the bus listener run them on every tick/message)
+FMP_BY_CODE = {s.replace("-","").replace(".CC","").replace(".US",""): s for s in FMP_ASSETS}  # "BTCUSD" -> "BTC-USD.CC"
+BANNER_SYMBOLS = frozenset(FMP_ASSETS) | frozenset(YAHOO_MAP.values())
+
+def fetch_yahoo_quotes(symbols: list):
+    """
+    ONE batched yf.download for every symbol (threaded inside yfinance) instead of a
+    fast_info scrape per ticker. Returns {symbol: (last_price, previous_close)}.
+    """
+    import yfinance as yf # Lazy: keeps the SDK off the API boot path
+    df = yf.download(" ".join(symbols), period="5d", interval="1d", group_by="column", threads=True, progress=False, auto_adjust=False)
+    if df is None or df.empty: return {}
+    closes = df["Close"]
+    quotes = {}
+    for y_sym in symbols:
+        if y_sym not in closes: continue
+        col = closes[y_sym].dropna().to_numpy()  # Holidays differ per market -> last two real sessions
+        if len(col) >= 2: quotes[y_sym] = (float(col[-1]), float(col[-2]))
+    return quotes
+
 class StreamProducer:
     def __init__(self):
         self.is_running = False
@@ -52,14 +71,14 @@ class StreamProducer:
             await asyncio.sleep(5)
 
     async def _poll_bullish_screener(self):
-        from .chartink_engine import SCREENERS, fetch_screener
+        from .chartink_engine import SCREENERS, fetch_screener_async
         while self.is_running:
             if not self.is_master:
                 await asyncio.sleep(10)
                 continue
             try:
                 for key in SCREENERS.keys():
-                    data = await asyncio.to_thread(fetch_screener, key)
+                    data = await fetch_screener_async(key)
                     if data and len(data) > 0:
                         await redis_client.set_cache(f"live_screener_{key}", data, 86400)
                         logger.info(f"✅ Auto-Scraped {len(data)} stocks for {key}")
@@ -74,19 +93,16 @@ class StreamProducer:
                 await asyncio.sleep(3)
                 continue
             try:
-                tickers_str = " ".join(yahoo_symbols)
-                data = await asyncio.to_thread(lambda: yf.Tickers(tickers_str))
-                for y_sym in yahoo_symbols:
+                # All network I/O happens in the thread; the loop only publishes
+                quotes = await asyncio.to_thread(fetch_yahoo_quotes, yahoo_symbols)
+                for y_sym, (price, prev) in quotes.items():
                     try:
-                        info = data.tickers[y_sym].fast_info
-                        price = info.last_price
-                        prev = info.previous_close
                         if price and prev:
                             await redis_client.publish_update(YAHOO_MAP[y_sym], {
                                 "price": price, "change": price - prev, "percent_change": ((price - prev) / prev) * 100, "timestamp": int(asyncio.get_event_loop().time())
                             })
-                    except: continue
-            except: pass
+                    except Exception: continue
+            except Exception: pass
             await asyncio.sleep(3)
 
     async def _poll_fmp_assets(self):
@@ -95,16 +111,16 @@ class StreamProducer:
                 await asyncio.sleep(1)
                 continue
             try:
-                data = await asyncio.to_thread(fmp_service.get_crypto_real_time_bulk, FMP_ASSETS)
+                data = await fmp_service.get_crypto_real_time_bulk_async(FMP_ASSETS)
                 if data:
                     for item in data:
                         fmp_sym = item.get('symbol')
-                        internal_sym = next((s for s in FMP_ASSETS if fmp_sym in s.replace("-","").replace(".CC","").replace(".US","")), None)
+                        internal_sym = FMP_BY_CODE.get(fmp_sym)
                         if internal_sym:
                             await redis_client.publish_update(internal_sym, {
                                 "price": item.get('price'), "change": item.get('change'), "percent_change": item.get('changesPercentage'), "timestamp": item.get('timestamp')
                             })
-            except: pass
+            except Exception: pass
             await asyncio.sleep(1) 
 
     async def _poll_eodhd_assets(self):
@@ -114,20 +130,25 @@ class StreamProducer:
                 continue
             try:
                 active_list = await redis_client.get_active_symbols()
-                targets =[s for s in active_list if s not in FMP_ASSETS and s not in YAHOO_MAP.values()]
+                targets =[s for s in active_list if s not in BANNER_SYMBOLS]
                 if targets:
                     for i in range(0, len(targets), 50):
                         chunk = targets[i:i+50]
-                        data = await asyncio.to_thread(eodhd_service.get_real_time_bulk, chunk)
+                        data = await eodhd_service.get_real_time_bulk_async(chunk)
                         if data:
+                            # Reply codes may be bare ("RELIANCE") or full ("RELIANCE.NSE")
+                            by_code = {}
+                            for t in chunk:
+                                by_code.setdefault(t, t)
+                                by_code.setdefault(t.split('.')[0], t)
                             for item in data:
                                 code = item.get('code')
-                                target_sym = next((t for t in chunk if code in t), None)
+                                target_sym = by_code.get(code)
                                 if target_sym:
                                     await redis_client.publish_update(target_sym, {
                                         "price": item.get('close'), "change": item.get('change'), "percent_change": item.get('change_p'), "timestamp": item.get('timestamp')
                                     })
-            except: pass
+            except Exception: pass
             await asyncio.sleep(1.5)
 
 class StreamConsumer:
@@ -140,7 +161,10 @@ class StreamConsumer:
         if symbol not in self.active_sockets: self.active_sockets[symbol] = []
         self.active_sockets[symbol].append(websocket)
         await redis_client.add_active_symbol(symbol)
-        if not self.is_listening: asyncio.create_task(self._listen_to_bus())
+        if not self.is_listening:
+            # Flag set before the task runs: sockets connecting in the same tick must not spawn extra listeners
+            self.is_listening = True
+            asyncio.create_task(self._listen_to_bus())
 
     def disconnect(self, websocket: WebSocket, symbol: str):
         if symbol in self.active_sockets:
@@ -156,27 +180,28 @@ class StreamConsumer:
             async for message in subscriber.listen():
                 if message["type"] == "message":
                     try:
-                        payload = json.loads(message["data"])
+                        payload = orjson.loads(message["data"])
                         symbol = payload["symbol"]
                         data = payload["data"]
-                        if symbol in self.active_sockets: await self._broadcast_to_list(symbol, data)
-                        is_banner = (symbol in FMP_ASSETS or symbol in YAHOO_MAP.values())
+                        # Each frame is serialized once per tick, then the same text goes to every socket
+                        if symbol in self.active_sockets:
+                            await self._broadcast_to_list(symbol, orjson.dumps(data).decode())
+                        is_banner = symbol in BANNER_SYMBOLS
                         if is_banner and "MARKET_OVERVIEW" in self.active_sockets:
-                            await self._broadcast_to_list("MARKET_OVERVIEW", {**data, "symbol": symbol})
-                    except: pass
-        except:
+                            await self._broadcast_to_list("MARKET_OVERVIEW", orjson.dumps({**data, "symbol": symbol}).decode())
+                    except Exception: pass
+        except Exception:
             self.is_listening = False
             await asyncio.sleep(5)
             asyncio.create_task(self._listen_to_bus())
 
-    async def _broadcast_to_list(self, key: str, data: dict):
-        if key not in self.active_sockets: return
-        msg = json.dumps(data)
-        dead =[]
-        for ws in self.active_sockets[key]:
-            try: await ws.send_text(msg)
-            except: dead.append(ws)
-        for ws in dead: self.disconnect(ws, key)
+    async def _broadcast_to_list(self, key: str, msg: str):
+        sockets = list(self.active_sockets.get(key, ()))
+        if not sockets: return
+        # Concurrent sends: one slow client no longer delays everyone queued behind it
+        results = await asyncio.gather(*[ws.send_text(msg) for ws in sockets], return_exceptions=True)
+        for ws, res in zip(sockets, results):
+            if isinstance(res, Exception): self.disconnect(ws, key)
 
 producer = StreamProducer()
 consumer = StreamConsumer()
@@ -0,0 +1,163 @@
+import re
+import time
+import asyncio
+from functools import lru_cache
+from urllib.parse import unquote
+from async_lru import alru_cache
+from .system_watchdog import auto_heal
+
+# ==========================================
+# 1. ALIAS TABLES (Single source, built once at import)
+# ==========================================
+CRYPTO_NAMES = {"BITCOIN": "BTC", "ETHEREUM": "ETH", "SOLANA": "SOL", "RIPPLE": "XRP", "DOGECOIN": "DOGE"}
+CRYPTO_NAME_RE = re.compile("|".join(CRYPTO_NAMES))
+
+INDEX_ALIASES = {
+    "NSEI.INDX": ["NIFTY", "NIFTY50", "NSEI"],
+    "NSEBANK.INDX": ["BANKNIFTY", "NIFTYBANK", "NSEBANK"],
+    "BSESN.INDX": ["SENSEX", "BSESN"],
+    "GSPC.INDX": ["SPX", "S&P500", "GSPC"],
+    "NDX.INDX": ["NDX", "NASDAQ"],
+    "DJI.INDX": ["DOW", "DJI", "DOWJONES"],
+}
+COMMODITY_ALIASES = {
+    "XAUUSD": ["GOLD", "XAU", "XAUUSD", "GC=F"],
+    "XAGUSD": ["SILVER", "XAG", "XAGUSD", "SI=F"],
+    "CLUSD": ["CRUDE", "OIL", "WTI", "CLUSD", "CL=F"],
+    "UKOIL": ["BRENT", "UKOIL"],
+    "NGUSD": ["NATURALGAS", "NGUSD", "NG=F"],
+}
+CRYPTO_TICKERS = ["BTC", "ETH", "SOL", "XRP", "DOGE", "BNB", "MATIC", "ADA", "AVAX", "DOT", "LTC", "SHIB"]
+CRYPTO_TICKER_SET = frozenset(CRYPTO_TICKERS)
+CRYPTO_TICKER_RE = re.compile("|".join(CRYPTO_TICKERS))
+
+# alias -> ticker
+INDEX_TABLE = {alias: ticker for ticker, aliases in INDEX_ALIASES.items() for alias in aliases}
+COMMODITY_TABLE = {alias: ticker for ticker, aliases in COMMODITY_ALIASES.items() for alias in aliases}
+
+# Separators dropped in one pass; quote-currency (and for URL symbols, exchange) stripped only as suffixes
+CLEAN_TRANS = str.maketrans("", "", "/- ")
+CHART_SUFFIX_RE = re.compile(r"(USDT|USD)$")
+URL_SUFFIX_RE = re.compile(r"(USDT|USD)?(\.NSE|\.BSE|\.NS|\.BO)?$")
+# "BTC-USD.CC" / "BTC-USD" / "BTCUSD" -> "BTC" in one scan (longest quote form first)
+CRYPTO_QUOTE_RE = re.compile(r"-USD\.CC|-USD|USD|\.CC")
+
+def build_resolver_table():
+    table = {}
+    for alias, ticker in INDEX_TABLE.items(): table.setdefault(alias, (ticker, "EODHD"))
+    for alias, ticker in COMMODITY_TABLE.items(): table.setdefault(alias, (ticker, "FMP"))
+    for c in CRYPTO_TICKERS:
+        table.setdefault(c, (f"{c}-USD.CC", "EODHD"))
+    return table
+
+RESOLVER_TABLE = build_resolver_table()
+
+def replace_crypto_names(s: str) -> str:
+    return CRYPTO_NAME_RE.sub(lambda m: CRYPTO_NAMES[m.group(0)], s)
+
+# ==========================================
+# 2. CHART UPLOAD RESOLVER (AI text -> symbol, source)
+# ==========================================
+# Pure string mapping -> memoize it forever (bounded).
+@alru_cache(maxsize=4096)
+@auto_heal(fallback_return=("NSEI.INDX", "EODHD"))
+async def resolve(ai_text: str):
+    s = replace_crypto_names(ai_text.strip().upper())
+    clean_sym = CHART_SUFFIX_RE.sub("", s.translate(CLEAN_TRANS))
+
+    # One hash probe covers indices, commodities & crypto tickers
+    hit = RESOLVER_TABLE.get(clean_sym) or RESOLVER_TABLE.get(s)
+    if hit: return hit
+
+    # Crypto ticker embedded in free text (e.g. "BTC PERP")
+    m = CRYPTO_TICKER_RE.search(s)
+    if m: return f"{m.group(0)}-USD.CC", "EODHD"
+
+    if "." not in s: return f"{s}.NSE", "EODHD"
+    if ".NS" in s: return s.replace(".NS", ".NSE"), "EODHD"
+    if ".BO" in s: return s.replace(".BO", ".BSE"), "EODHD"
+    return s, "EODHD"
+
+# ==========================================
+# 3. URL ASSET CLASSIFIER (path symbol -> source, ticker)
+# ==========================================
+# Pure function of the path symbol and called by every stocks endpoint -> memoized,
+# so repeat symbols skip the regex scans entirely (returns an immutable tuple).
+@lru_cache(maxsize=4096)
+def identify_asset_class(symbol: str):
+    s = unquote(symbol).upper().strip()
+    clean_sym = URL_SUFFIX_RE.sub("", s.translate(CLEAN_TRANS))
+    s = replace_crypto_names(s)
+
+    commodity = COMMODITY_TABLE.get(s) or COMMODITY_TABLE.get(clean_sym)
+    if commodity: return "FMP", commodity
+
+    base = CRYPTO_QUOTE_RE.sub("", s)
+    if base in CRYPTO_TICKER_SET: return "EODHD", f"{base}-USD.CC"
+
+    # STRICT EXACT MATCHING (Fixes HDFCBANK -> BANKNIFTY data hijack)
+    index = INDEX_TABLE.get(clean_sym)
+    if index: return "EODHD", index
+    if ".INDX" in s: return "EODHD", s
+
+    if "." not in s: return "EODHD", f"{s}.NSE"
+    if ".NS" in s: return "EODHD", s.replace(".NS", ".NSE")
+    if ".BO" in s: return "EODHD", s.replace(".BO", ".BSE")
+
+    return "EODHD", s
+
+# ==========================================
+# 4. KNOWN LISTINGS (EODHD exchange symbol lists, one set probe)
+# ==========================================
+# Bare tickers typed into search ("RELIANCE", "AAPL") that FMP's search misses resolve
+# from a local set instead of a Gemini round-trip. Lists are shared via Redis for a week and
+# refreshed lazily in the background, so a request never waits on the download.
+SYMBOL_LIST_TTL = 7 * 86400
+SYMBOL_LIST_RETRY = 300  # back-off after a refresh where every exchange came back empty
+SYMBOL_LIST_EXCHANGES = {"NSE": ".NS", "US": ""}  # EODHD exchange -> frontend suffix (NSE first)
+KNOWN_SYMBOLS = {ex: frozenset() for ex in SYMBOL_LIST_EXCHANGES}
+KNOWN_SYMBOLS_LOADED_AT = 0.0
+KNOWN_SYMBOLS_RETRY_AT = 0.0
+KNOWN_SYMBOLS_TASK = None
+
+async def load_symbol_list(exchange: str):
+    from . import eodhd_service, http_client
+    from .redis_service import redis_client
+    cache_key = f"symbol_list_v1_{exchange}"
+    codes = await redis_client.get_cache(cache_key)
+    if codes: return codes
+    if not eodhd_service.EODHD_API_KEY: return []
+    url = f"{eodhd_service.BASE_URL}/exchange-symbol-list/{exchange}?api_token={eodhd_service.EODHD_API_KEY}&fmt=json"
+    rows = await http_client.get_json(url, timeout=30)
+    if not isinstance(rows, list): return []
+    codes = [str(r.get("Code", "")).upper() for r in rows if isinstance(r, dict) and r.get("Code")]
+    if codes: await redis_client.set_cache(cache_key, codes, SYMBOL_LIST_TTL)
+    return codes
+
+async def refresh_known_symbols():
+    global KNOWN_SYMBOLS_LOADED_AT, KNOWN_SYMBOLS_RETRY_AT
+    loaded = False
+    for exchange in SYMBOL_LIST_EXCHANGES:
+        try:
+            codes = await load_symbol_list(exchange)
+            if codes:
+                KNOWN_SYMBOLS[exchange] = frozenset(codes)
+                loaded = True
+        except Exception: continue
+    # Only a real load starts the weekly clock; a total miss (no key, EODHD down) retries soon
+    if loaded: KNOWN_SYMBOLS_LOADED_AT = time.monotonic()
+    else: KNOWN_SYMBOLS_RETRY_AT = time.monotonic() + SYMBOL_LIST_RETRY
+
+def lookup_known_symbol(query: str):
+    """Bare ticker -> frontend symbol ("RELIANCE" -> "RELIANCE.NS"), or None if unknown."""
+    global KNOWN_SYMBOLS_TASK
+    now = time.monotonic()
+    stale = not KNOWN_SYMBOLS_LOADED_AT or now - KNOWN_SYMBOLS_LOADED_AT > SYMBOL_LIST_TTL
+    if stale and now >= KNOWN_SYMBOLS_RETRY_AT:
+        # Single-flight background refresh; this request answers from the current set
+        if KNOWN_SYMBOLS_TASK is None or KNOWN_SYMBOLS_TASK.done():
+            KNOWN_SYMBOLS_TASK = asyncio.create_task(refresh_known_symbols())
+    s = query.strip().upper()
+    for exchange, suffix in SYMBOL_LIST_EXCHANGES.items():
+        if s in KNOWN_SYMBOLS[exchange]: return f"{s}{suffix}"
+    return None
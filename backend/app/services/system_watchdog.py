@@ -1,6 +1,9 @@
-﻿import traceback
+﻿import logging
+import traceback
 from functools import wraps
 
+logger = logging.getLogger("Watchdog")
+
 def auto_heal(fallback_return):
     """
     ENTERPRISE AUTO-HEALER DECORATOR.
@@ -14,8 +17,7 @@ def auto_heal(fallback_return):
             try:
                 return func(*args, **kwargs)
             except Exception as e:
-                print(f"\n🛡️ [WATCHDOG] Auto-Healed crash in {func.__name__}")
-                print(f"   -> Error: {str(e)}")
+                logger.warning("🛡️ [WATCHDOG] Auto-Healed crash in %s -> Error: %s", func.__name__, e)
                 # traceback.print_exc() # Uncomment for deep debugging
                 return fallback_return
 
@@ -24,8 +26,7 @@ def auto_heal(fallback_return):
             try:
                 return await func(*args, **kwargs)
             except Exception as e:
-                print(f"\n🛡️ [WATCHDOG] Auto-Healed crash in {func.__name__}")
-                print(f"   -> Error: {str(e)}")
+                logger.warning("🛡️ [WATCHDOG] Auto-Healed crash in %s -> Error: %s", func.__name__, e)
                 return fallback_return
 
         # Return the async wrapper if the original function is async
@@ -1,11 +1,74 @@
+import asyncio
 import pandas as pd
 import pandas_ta as ta
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# ==========================================
+# 0. SHARED TA EXECUTOR (CPU math off the event loop)
+# ==========================================
+# Threads, not processes: gunicorn already runs one worker per core, the numpy/pandas
+# kernels release the GIL, and a process pool would pickle every frame per call.
+TA_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ta")
+
+async def run_ta(fn, *args):
+    """Runs CPU-bound indicator work on TA_POOL (never queued behind blocking HTTP threads)."""
+    return await asyncio.get_running_loop().run_in_executor(TA_POOL, fn, *args)
+
+# What a single indicator can raise on short / gappy frames (bad column, NaN window,
+# empty result). Anything else is a real bug and is allowed to surface.
+TA_ERRORS = (KeyError, IndexError, ValueError, TypeError, AttributeError, ZeroDivisionError)
 
 # ==========================================
 # 1. CHART RESAMPLING ENGINE (High-End Speed)
 # ==========================================
 
+OHLCV_COLUMNS = ("open", "high", "low", "close", "volume")
+
+def candles_to_frame(chart_data: list) -> pd.DataFrame:
+    """
+    Builds the OHLCV DataFrame column-by-column with fixed dtypes.
+    ~2x faster than pd.DataFrame(list_of_dicts), which infers keys & dtypes row by row.
+    """
+    try:
+        times = np.array([c.get("time") for c in chart_data], dtype=np.int64)
+    except (TypeError, ValueError):
+        # A candle with a None/missing time can't be cast: drop it, not the whole chart
+        chart_data = [c for c in chart_data if c.get("time") is not None]
+        times = np.array([c.get("time") for c in chart_data], dtype=np.int64)
+    columns = {"time": times}
+    for col in OHLCV_COLUMNS:
+        columns[col] = np.array([c.get(col) for c in chart_data], dtype=np.float64)  # None -> NaN
+    return pd.DataFrame(columns, copy=False)
+
+# Frontend timeframe -> Pandas offset alias
+RESAMPLE_RULES = {
+    "15m": "15min", "15M": "15min",
+    "30m": "30min", "30M": "30min",
+    "1h": "1h", "1H": "1h",
+    "4h": "4h", "4H": "4h",
+    "1d": "1D", "1D": "1D",
+    "1w": "1W", "1W": "1W"
+}
+# Open = first, High = max, Low = min, Close = last, Volume = sum of the bucket
+RESAMPLE_AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+def resample_frame(df: pd.DataFrame, target_interval: str) -> pd.DataFrame:
+    """
+    Frame -> Frame resample (same columns as candles_to_frame).
+    Lets callers that already hold a DataFrame skip the list-of-dicts round trip.
+    Returns the input frame untouched for 5M / unknown intervals.
+    """
+    rule = RESAMPLE_RULES.get(target_interval)
+    if not rule or target_interval.upper() == "5M": return df
+
+    resampled = df.set_index(pd.to_datetime(df['time'], unit='s')).resample(rule).agg(RESAMPLE_AGG)
+    # Remove rows with NaN (which happen during market close hours)
+    resampled.dropna(inplace=True)
+    # Convert timestamp back to Unix Seconds
+    resampled.insert(0, 'time', (resampled.index - pd.Timestamp('1970-01-01')) // pd.Timedelta('1s'))
+    return resampled.reset_index(drop=True)
+
 def resample_chart_data(chart_data: list, target_interval: str):
     """
     Mathematically converts 5-Minute (Base) candles into higher timeframes.
@@ -17,71 +80,73 @@ def resample_chart_data(chart_data: list, target_interval: str):
     if not chart_data or len(chart_data) < 2: 
         return []
 
-    try:
-        # 1. Convert list of dicts to DataFrame
-        df = pd.DataFrame(chart_data)
-        
-        # 2. Set Index to Datetime (Required for resampling)
-        # We assume 'time' is Unix timestamp in seconds
-        df['datetime'] = pd.to_datetime(df['time'], unit='s')
-        df.set_index('datetime', inplace=True)
-        
-        # 3. Map Frontend Timeframes to Pandas Offset Aliases
-        # Frontend: 15m, 1H, 4H, 1D
-        # Pandas: 15min, 1h, 4h, 1D
-        mapping = {
-            "15m": "15min", "15M": "15min",
-            "30m": "30min", "30M": "30min",
-            "1h": "1h", "1H": "1h",
-            "4h": "4h", "4H": "4h",
-            "1d": "1D", "1D": "1D",
-            "1w": "1W", "1W": "1W"
-        }
-        
-        rule = mapping.get(target_interval)
-        
-        # If no rule found or rule matches input (5M), return original
-        if not rule or target_interval.upper() == "5M": 
-            return chart_data
-
-        # 4. Resample Logic (OHLCV Aggregation)
-        # Open  = First price of the bucket
-        # High  = Max price of the bucket
-        # Low   = Min price of the bucket
-        # Close = Last price of the bucket
-        # Volume = Sum of volume in the bucket
-        resampled = df.resample(rule).agg({
-            'open': 'first',
-            'high': 'max',
-            'low': 'min',
-            'close': 'last',
-            'volume': 'sum'
-        })
-        
-        # 5. Cleanup
-        # Remove rows with NaN (which happen during market close hours)
-        resampled.dropna(inplace=True)
-        
-        # 6. Format back to Lightweight Charts format
-        resampled.reset_index(inplace=True)
-        
-        # Convert timestamp back to Unix Seconds
-        resampled['time'] = (resampled['datetime'] - pd.Timestamp('1970-01-01')) // pd.Timedelta('1s')
-        
-        # Select and order columns
-        final_data = resampled[['time', 'open', 'high', 'low', 'close', 'volume']].to_dict('records')
-        
-        return final_data
+    # If no rule found or rule matches input (5M), return original
+    if not RESAMPLE_RULES.get(target_interval) or target_interval.upper() == "5M":
+        return chart_data
 
+    try:
+        # Format back to Lightweight Charts format
+        return resample_frame(candles_to_frame(chart_data), target_interval).to_dict('records')
     except Exception as e:
-        # print(f"Resampling Error: {e}")
         # On error, fallback to returning the original data to prevent crash
         return chart_data
 
+def indicator_bundle(chart_data: list, resample_to: str = None):
+    """
+    Candles -> (df, technicals, pivots, moving averages) in one call,
+    so an endpoint ships the whole CPU-bound chain to TA_POOL in a single hop.
+    """
+    if resample_to:
+        df = resample_frame(candles_to_frame(chart_data), resample_to)
+    else:
+        # Every calculator reads at most the last TA_LOOKBACK bars -> only those are framed
+        df = candles_to_frame(chart_data[-TA_LOOKBACK:])
+    return df, calculate_technical_indicators(df), calculate_pivot_points(df), calculate_moving_averages(df)
+
+def warm_up():
+    """
+    One throwaway run of the full chain (resample + every indicator) at boot, so
+    pandas/pandas_ta lazy imports and first-call setup aren't paid by the first user.
+    """
+    closes = 100 + np.sin(np.arange(300) / 7.0)
+    chart_data = [{"time": 1700000000 + i * 300, "open": c, "high": c + 1, "low": c - 1, "close": c, "volume": 1.0}
+                  for i, c in enumerate(closes.tolist())]
+    try: indicator_bundle(chart_data, "1H")
+    except Exception: pass
+
 # ==========================================
 # 2. INDICATORS (RSI, MACD, STOCH, ADX)
 # ==========================================
 
+# Only the last two rows are read. Every indicator below is either windowed (<= 20 bars)
+# or an exponential smoother (RSI/ATR/ADX/MACD): after 500 bars the seed's weight is
+# < 1e-15, so the tail gives the same values as full history at a fraction of the cost.
+TA_LOOKBACK = 500
+
+def window_indicators(high: np.ndarray, low: np.ndarray, close: np.ndarray):
+    """
+    Williams %R (14), Stochastic %K (14, 3, 3) and Bollinger Bands (20, 2) from their
+    LAST window only: same formulas as pandas_ta (SMA-smoothed %K, population std),
+    without building three full rolling series just to read one row.
+    """
+    out = {}
+    n = len(close)
+    if n >= 14:
+        hh, ll = high[-14:].max(), low[-14:].min()
+        out['WILLR_14'] = 100 * ((close[-1] - ll) / (hh - ll) - 1)
+    if n >= 16:
+        raw_k = []
+        for i in range(n - 3, n):
+            hh, ll = high[i - 13:i + 1].max(), low[i - 13:i + 1].min()
+            rng = hh - ll
+            raw_k.append(100 * (close[i] - ll) / (rng if rng != 0 else np.finfo(np.float64).eps))
+        out['STOCHk_14_3_3'] = sum(raw_k) / 3
+    if n >= 20:
+        w = close[-20:]
+        mid, sd = w.mean(), w.std()
+        out.update({'BBL_20_2.0': mid - 2 * sd, 'BBM_20_2.0': mid, 'BBU_20_2.0': mid + 2 * sd})
+    return out
+
 def calculate_technical_indicators(df: pd.DataFrame):
     """
     Calculates RSI, MACD, Stoch, ADX, ATR using Pandas TA.
@@ -91,38 +156,42 @@ def calculate_technical_indicators(df: pd.DataFrame):
         return {}
     
     try:
-        # Create a copy to prevent SettingWithCopy warnings
-        wdf = df.copy()
+        # Bounded, read-only window: indicators come back as Series/DataFrames
+        # (append=False), so there is no working copy and no column inserts.
+        wdf = df.tail(TA_LOOKBACK)
+        latest = {"close": wdf['close'].iat[-1]}
+
+        def collect(result):
+            # Only each indicator's last row is used
+            if isinstance(result, pd.Series): latest[result.name] = result.iat[-1]
+            elif isinstance(result, pd.DataFrame): latest.update(result.iloc[-1].to_dict())
         
         # Calculate Indicators
         # We catch individual errors to prevent one indicator crashing the whole set
-        try: wdf.ta.rsi(length=14, append=True)
-        except: pass
-        try: wdf.ta.macd(fast=12, slow=26, signal=9, append=True)
-        except: pass
-        try: wdf.ta.stoch(k=14, d=3, smooth_k=3, append=True)
-        except: pass
-        try: wdf.ta.adx(length=14, append=True)
-        except: pass
-        try: wdf.ta.atr(length=14, append=True)
-        except: pass
-        try: wdf.ta.willr(length=14, append=True)
-        except: pass
-        try: wdf.ta.bbands(length=20, std=2, append=True)
-        except: pass
+        try: collect(wdf.ta.rsi(length=14))
+        except TA_ERRORS: pass
+        try: collect(wdf.ta.macd(fast=12, slow=26, signal=9))
+        except TA_ERRORS: pass
+        try: collect(wdf.ta.adx(length=14))
+        except TA_ERRORS: pass
+        try: collect(wdf.ta.atr(length=14))
+        except TA_ERRORS: pass
+        # Window-only indicators straight off the arrays (no rolling series)
+        try:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                latest.update(window_indicators(wdf['high'].to_numpy(dtype=np.float64), wdf['low'].to_numpy(dtype=np.float64), wdf['close'].to_numpy(dtype=np.float64)))
+        except TA_ERRORS: pass
 
         # Get Latest Data Point
-        latest = wdf.iloc[-1]
-        prev = wdf.iloc[-2] if len(wdf) > 1 else latest
+        prev_close = float(wdf['close'].iat[-2])
         
         # Helper to safely extract float values (Handles NaN/None)
         def get_val(key):
+            val = latest.get(key)
+            if val is None: return None
             try:
-                val = latest.get(key)
-                if val is None or pd.isna(val) or np.isnan(val):
-                    return None
-                return float(val)
-            except: return None
+                return None if np.isnan(val) else float(val)
+            except (TypeError, ValueError): return None
 
         return {
             "rsi": get_val('RSI_14'),
@@ -140,8 +209,8 @@ def calculate_technical_indicators(df: pd.DataFrame):
             # Context for AI Analysis
             "price_action": {
                 "current_close": get_val('close'),
-                "prev_close": float(prev['close']),
-                "trend": "UP" if get_val('close') > float(prev['close']) else "DOWN"
+                "prev_close": prev_close,
+                "trend": "UP" if get_val('close') > prev_close else "DOWN"
             }
         }
     except Exception as e:
@@ -152,6 +221,8 @@ def calculate_technical_indicators(df: pd.DataFrame):
 # 3. MOVING AVERAGES (SMA)
 # ==========================================
 
+MA_PERIODS = (5, 10, 20, 50, 100, 200)
+
 def calculate_moving_averages(df: pd.DataFrame):
     """
     Calculates Simple Moving Averages (5, 10, 20, 50, 100, 200).
@@ -159,16 +230,17 @@ def calculate_moving_averages(df: pd.DataFrame):
     if df is None or df.empty: return {}
     
     try:
-        wdf = df.copy()
+        # Only the latest value is used. One fused pass: a running sum over the newest
+        # 200 closes (newest first) gives every SMA as csum[p-1] / p. NaN propagates,
+        # so any gap inside a window still yields None. Read-only, so no DataFrame copy.
+        close = df['close'].to_numpy(dtype=np.float64)
+        csum = np.cumsum(close[:-MA_PERIODS[-1] - 1:-1])
         mas = {}
         
-        periods = [5, 10, 20, 50, 100, 200]
-        
-        for p in periods:
-            if len(wdf) >= p:
-                # Rolling mean is faster than pandas_ta for simple SMA
-                val = wdf['close'].rolling(window=p).mean().iloc[-1]
-                mas[str(p)] = float(val) if not pd.isna(val) else None
+        for p in MA_PERIODS:
+            if len(close) >= p:
+                val = csum[p - 1] / p
+                mas[str(p)] = float(val) if not np.isnan(val) else None
             else:
                 mas[str(p)] = None
                 
@@ -187,12 +259,10 @@ def calculate_pivot_points(df: pd.DataFrame):
     if df is None or len(df) < 2: return {}
     
     try:
-        # We need the previous completed candle
-        prev = df.iloc[-2]
-        
-        h = float(prev['high'])
-        l = float(prev['low'])
-        c = float(prev['close'])
+        # We need the previous completed candle (scalar reads, no row Series built)
+        h = float(df['high'].iat[-2])
+        l = float(df['low'].iat[-2])
+        c = float(df['close'].iat[-2])
         
         # Classic Pivot
         pp = (h + l + c) / 3
@@ -339,5 +409,5 @@ def calculate_extended_technicals(df: pd.DataFrame):
             "support": {"s1": pivots.get('classic', {}).get('s1'), "s2": pivots.get('classic', {}).get('s2')},
             "resistance": {"r1": pivots.get('classic', {}).get('r1'), "r2": pivots.get('classic', {}).get('r2')}
         }
-    except:
+    except Exception:
         return None
\ No newline at end of file
@@ -1,47 +1,64 @@
 import os
+import asyncio
 import pyotp
-import requests
 import base64
+import logging
 from urllib.parse import urlparse, parse_qs
 from fyers_apiv3 import fyersModel
+from ..services import http_client
 
-def get_fresh_fyers_token():
-    client_id = os.getenv("FYERS_CLIENT_ID")
-    secret_key = os.getenv("FYERS_SECRET_KEY")
-    redirect_uri = "https://trade.fyers.in/api-login/redirect-uri/index.html"
-    user_id = os.getenv("FYERS_USER_ID")
-    pin = os.getenv("FYERS_PIN")
-    totp_key = os.getenv("FYERS_TOTP_KEY")
+logger = logging.getLogger("AuthHelper")
 
-    if not all([client_id, secret_key, user_id, pin, totp_key]):
-        print("❌ Missing Auto-Login Credentials")
+# --- CREDENTIALS (Loaded & Derived ONCE at import) ---
+FYERS_CLIENT_ID = os.getenv("FYERS_CLIENT_ID")
+FYERS_SECRET_KEY = os.getenv("FYERS_SECRET_KEY")
+FYERS_REDIRECT_URI = "https://trade.fyers.in/api-login/redirect-uri/index.html"
+FYERS_USER_ID = os.getenv("FYERS_USER_ID")
+FYERS_PIN = os.getenv("FYERS_PIN")
+FYERS_TOTP_KEY = os.getenv("FYERS_TOTP_KEY")
+
+CREDENTIALS_OK = all([FYERS_CLIENT_ID, FYERS_SECRET_KEY, FYERS_USER_ID, FYERS_PIN, FYERS_TOTP_KEY])
+
+# Static login payload pieces (no re-encoding on every login)
+FYERS_APP_ID = (FYERS_CLIENT_ID[:-4] if FYERS_CLIENT_ID.endswith("-100") else FYERS_CLIENT_ID) if FYERS_CLIENT_ID else None
+ENCODED_USER_ID = base64.b64encode(FYERS_USER_ID.encode()).decode() if FYERS_USER_ID else None
+ENCODED_PIN = base64.b64encode(FYERS_PIN.encode()).decode() if FYERS_PIN else None
+
+async def get_fresh_fyers_token():
+    client_id = FYERS_CLIENT_ID
+    secret_key = FYERS_SECRET_KEY
+    redirect_uri = FYERS_REDIRECT_URI
+    user_id = FYERS_USER_ID
+
+    if not CREDENTIALS_OK:
+        logger.error("❌ Missing Auto-Login Credentials")
         return None
 
     try:
-        # 1. Login Flow (Simulated)
-        session = requests.Session()
-        res = session.post("https://api-t2.fyers.in/vagator/v1/send_login_otp", json={"fy_id": base64.b64encode(f"{user_id}".encode()).decode(), "app_id": "2"}).json()
+        # 1. Login Flow (Simulated) - non-blocking, over the worker's shared httpx pool
+        res = await http_client.post_json("https://api-t2.fyers.in/vagator/v1/send_login_otp", json={"fy_id": ENCODED_USER_ID, "app_id": "2"})
         request_key = res["request_key"]
 
-        otp = pyotp.TOTP(totp_key).now()
-        res = session.post("https://api-t2.fyers.in/vagator/v1/verify_otp", json={"request_key": request_key, "otp": otp}).json()
+        otp = pyotp.TOTP(FYERS_TOTP_KEY).now()
+        res = await http_client.post_json("https://api-t2.fyers.in/vagator/v1/verify_otp", json={"request_key": request_key, "otp": otp})
         request_key_2 = res["request_key"]
 
-        res = session.post("https://api-t2.fyers.in/vagator/v1/verify_pin_v2", json={"request_key": request_key_2, "identity_type": "pin", "identifier": base64.b64encode(f"{pin}".encode()).decode()}).json()
+        res = await http_client.post_json("https://api-t2.fyers.in/vagator/v1/verify_pin_v2", json={"request_key": request_key_2, "identity_type": "pin", "identifier": ENCODED_PIN})
         bearer_token = res["data"]["access_token"]
 
         headers = {"Authorization": f"Bearer {bearer_token}", "Content-Type": "application/json"}
-        auth_payload = {"fyers_id": user_id, "app_id": client_id[:-4] if client_id.endswith("-100") else client_id, "redirect_uri": redirect_uri, "response_type": "code", "state": "sample", "scope": "", "nonce": "", "create_cookie": True}
+        auth_payload = {"fyers_id": user_id, "app_id": FYERS_APP_ID, "redirect_uri": redirect_uri, "response_type": "code", "state": "sample", "scope": "", "nonce": "", "create_cookie": True}
         
-        res = session.post("https://api.fyers.in/api/v3/token", headers=headers, json=auth_payload).json()
+        res = await http_client.post_json("https://api.fyers.in/api/v3/token", headers=headers, json=auth_payload)
         auth_code = parse_qs(urlparse(res["Url"]).query)["auth_code"][0]
 
         # 2. Get Token
         fs = fyersModel.SessionModel(client_id=client_id, secret_key=secret_key, redirect_uri=redirect_uri, response_type="code", grant_type="authorization_code")
         fs.set_token(auth_code)
-        response = fs.generate_token()
+        # SDK call is blocking -> keep it off the event loop
+        response = await asyncio.to_thread(fs.generate_token)
         
         return response["access_token"]
     except Exception as e:
-        print(f"❌ Auto-Login Failed: {e}")
+        logger.error("❌ Auto-Login Failed: %s", e)
         return None
\ No newline at end of file
@@ -0,0 +1,34 @@
+import hashlib
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+# High-Speed JSON (orjson is 3-5x faster than stdlib json on market payloads)
+# Returning FastJSONResponse(...) directly from an endpoint also skips FastAPI's
+# recursive jsonable_encoder pass, which otherwise walks every dict/list first.
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def raw_json_response(payload) -> Response:
+    """Already-serialized JSON (e.g. straight from Redis) -> response. No decode/re-encode."""
+    return Response(content=payload, media_type="application/json")
+
+# --- CONDITIONAL GET (ETag / 304) ---
+# Polled endpoints return byte-identical JSON for seconds at a time: a client that
+# already holds it gets an empty 304 instead of the body again.
+def etag_for(payload: bytes) -> str:
+    return '"' + hashlib.blake2b(payload, digest_size=8).hexdigest() + '"'
+
+def etag_json_response(request, payload: bytes, etag: str = None) -> Response:
+    """Serialized JSON + ETag, or a bodiless 304 when If-None-Match already matches."""
+    etag = etag or etag_for(payload)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}  # no-cache = always revalidate (cheap 304)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
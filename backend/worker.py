@@ -49,9 +49,17 @@ async def run_worker():
         if counter % 60 == 0:
             print(f"💓 Worker is alive and processing ({counter}s uptime)...")
 
+# uvloop (shipped with uvicorn[standard]) -> cheaper await/gather scheduling.
+# The API workers already get it via UvicornWorker's loop="auto".
+try:
+    import uvloop
+    run_loop = uvloop.run
+except ImportError:
+    run_loop = asyncio.run
+
 if __name__ == "__main__":
     try:
-        asyncio.run(run_worker())
+        run_loop(run_worker())
     except KeyboardInterrupt:
         print("🛑 Worker shutting down.")
     except Exception as e:
@@ -38,6 +38,8 @@ const NewsTitle = styled.h4`
   margin-bottom: 0.5rem;
 `;
 
+const Loader = styled.div`display: flex; align-items: center; justify-content: center; height: 150px; color: var(--color-primary); font-weight: 500; letter-spacing: 1px;`;
+
 const NewsMeta = styled.div`
   display: flex;
   justify-content: space-between;
@@ -62,7 +64,16 @@ const formatDate = (isoString) => {
 
 // --- React Component ---
 
-const NewsList = ({ newsArticles }) => {
+const NewsList = ({ newsArticles, isLoading }) => {
+
+  // Still fetching: don't claim there is no news yet
+  if (isLoading) {
+    return (
+      <Card title="Latest News">
+        <Loader>Fetching Latest Headlines...</Loader>
+      </Card>
+    );
+  }
 
   // Defensive check: If there are no articles, show a message.
   if (!newsArticles || !Array.isArray(newsArticles) || newsArticles.length === 0) {
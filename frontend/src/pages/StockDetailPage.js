@@ -1,4 +1,4 @@
-﻿import React, { useState, useEffect, useCallback } from 'react';
+﻿import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { useParams, useNavigate, useLocation } from 'react-router-dom';
 import styled, { keyframes } from 'styled-components';
 import axios from 'axios';
@@ -112,6 +112,9 @@ const StockDetailPage = () => {
 
   // --- STATE ---
   const [data, setData] = useState(null);
+  // News loads on its own request (null = still loading) so it never delays /all
+  const [news, setNews] = useState(null);
+  const newsRef = useRef([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   
@@ -157,6 +160,22 @@ const StockDetailPage = () => {
     fetchData();
   }, [symbol]);
 
+  // --- 1b. NEWS (Parallel, non-blocking) ---
+  useEffect(() => {
+    let active = true;
+    setNews(null);
+    newsRef.current = [];
+    axios.get(`${API_URL}/api/stocks/${symbol}/news`)
+      .then(res => Array.isArray(res.data) ? res.data : [])
+      .catch(() => [])
+      .then(articles => {
+        if (!active) return;
+        newsRef.current = articles;
+        setNews(articles);
+      });
+    return () => { active = false; };
+  }, [symbol]);
+
   // --- 2. AI HANDLERS (LAZY LOADING) ---
   
   // SWOT Analysis (Runs for everything)
@@ -210,7 +229,7 @@ const StockDetailPage = () => {
             canslimAssessment: "Generated", 
             philosophyAssessment: "Generated",
             keyStats: data.keyStats,
-            newsHeadlines: data.news ? data.news.slice(0, 5).map(n => n.title) : []
+            newsHeadlines: newsRef.current.slice(0, 5).map(n => n.title)
         }).then(r => setConclusion(r.data.conclusion)).catch(() => setConclusion("N/A"));
 
         Promise.allSettled([req1, req2, req3]).finally(() => setLoadingFundAI(false));
@@ -262,7 +281,7 @@ const StockDetailPage = () => {
             <RightCol>
               {isStock && <OverallSentiment sentimentData={data.overall_sentiment} initialTechs={data.technical_indicators} initialMAs={data.moving_averages} quote={data.quote} symbol={symbol} />}
               <PriceLevels pivotPoints={data.pivot_points} quote={data.quote} profile={data.profile} />
-              <NewsList newsArticles={data.news} />
+              <NewsList newsArticles={news} isLoading={news === null} />
             </RightCol>
           </TabGrid>
         </TabPanel>
@@ -299,7 +318,7 @@ const StockDetailPage = () => {
             <Forecasts 
                 symbol={symbol} quote={data.quote} analystRatings={data.analyst_ratings}
                 priceTarget={data.price_target_consensus} keyStats={data.keyStats}
-                news={data.news} delay={0} currency={data.profile?.currency}
+                news={news} delay={0} currency={data.profile?.currency}
             />
         </TabPanel>
 